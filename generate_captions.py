@@ -7,14 +7,56 @@ This script generates captions for images using the Florence-2 model.
 
 import os
 import sys
+import copy
+import re
+import json
+import socket
+import asyncio
+import tempfile
+import getpass
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 import yaml
 import argparse
 from pathlib import Path
 from PIL import Image
 import torch
-from transformers import AutoProcessor, AutoModelForCausalLM
+from transformers import AutoProcessor, AutoModelForCausalLM, BitsAndBytesConfig, GenerationConfig
+from transformers.modeling_outputs import BaseModelOutput
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Pattern, Set, Tuple
+
+# Optional: libjpeg-turbo decoder for JPEG-heavy datasets (pip install PyTurboJPEG)
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _turbo_jpeg = None
+
+JPEG_SUFFIXES = {".jpg", ".jpeg"}
+
+# Optional: Intel Extension for PyTorch speeds up the CPU fallback with bfloat16/AMX
+try:
+    import intel_extension_for_pytorch as ipex
+except ImportError:
+    ipex = None
+
+# Florence-2 tasks whose output is plain text and needs no post-processing
+PLAIN_CAPTION_TASKS = {"<CAPTION>", "<DETAILED_CAPTION>", "<MORE_DETAILED_CAPTION>"}
+
+def get_default_socket_path() -> str:
+    """Returns a per-user caption server socket path."""
+    # XDG_RUNTIME_DIR is private to the user; the shared temp dir needs the uid in the name
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "lora_caption_server.sock")
+    uid = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"lora_caption_server-{uid}.sock")
+
+DEFAULT_SOCKET_PATH = get_default_socket_path()
 
 def setup_logging(log_level: str = "INFO") -> None:
     """Sets up logging configuration."""
@@ -37,93 +79,556 @@ def load_config(config_path: str) -> Dict[str, Any]:
 
 def get_image_files(directory: Path, supported_formats: List[str]) -> List[Path]:
     """Get all image files from a directory."""
-    image_files = []
-    for fmt in supported_formats:
-        image_files.extend(directory.glob(f"*{fmt}"))
-    return image_files
+    suffixes = {fmt.lower() for fmt in supported_formats}
+    with os.scandir(directory) as entries:
+        return sorted(Path(entry.path) for entry in entries
+                      if os.path.splitext(entry.name)[1].lower() in suffixes and entry.is_file())
 
-def generate_caption(model, processor, image_path: Path, device: str, caption_config: Dict[str, Any]) -> str:
-    """Generates a caption for a single image using Florence-2."""
+def get_caption_stems(directory: Path) -> Set[str]:
+    """Get the stems of all existing caption files in a directory."""
+    with os.scandir(directory) as entries:
+        return {entry.name[:-4] for entry in entries if entry.name.endswith(".txt")}
+
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Yields successive chunks of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def decode_image(image_path: Path) -> Image.Image:
+    """Opens and decodes an image as RGB."""
+    if _turbo_jpeg is not None and image_path.suffix.lower() in JPEG_SUFFIXES:
+        try:
+            with open(image_path, "rb") as f:
+                return Image.fromarray(_turbo_jpeg.decode(f.read(), pixel_format=TJPF_RGB))
+        except Exception as e:
+            logging.debug(f"TurboJPEG failed on {image_path.name}, falling back to PIL: {e}")
+    return Image.open(image_path).convert("RGB")
+
+def load_image(image_path: Path, resize_to: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """Decodes an image and optionally resizes it to the model's input size."""
+    image = decode_image(image_path)
+    if resize_to is not None and image.size != resize_to:
+        image = image.resize(resize_to, Image.BILINEAR)
+    return image
+
+def get_processor_image_size(processor) -> Optional[Tuple[int, int]]:
+    """Returns the (width, height) the image processor resizes inputs to, if fixed."""
+    size = getattr(processor.image_processor, "size", None)
+    if isinstance(size, dict) and "height" in size and "width" in size:
+        return size["width"], size["height"]
+    return None
+
+def prefetch_images(executor: ThreadPoolExecutor, chunks: Iterator[List[Path]], depth: int = 2,
+                    resize_to: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[List[Path], List[Future]]]:
+    """Yields each chunk with its decode futures while the next chunks decode in the background."""
+    pending = deque()
+    for chunk in chunks:
+        pending.append((chunk, [executor.submit(load_image, path, resize_to) for path in chunk]))
+        if len(pending) >= depth:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+def write_captions(write_queue: queue.Queue, failures: List[str]) -> None:
+    """Writes queued (caption_path, caption) pairs until a None sentinel arrives."""
+    while True:
+        item = write_queue.get()
+        if item is None:
+            break
+        caption_path, caption = item
+        try:
+            caption_path.write_text(caption, encoding="utf-8")
+        except Exception as e:
+            logging.error(f"  -> Failed to write caption {caption_path.name}: {e}")
+            failures.append(caption_path.name)
+
+@lru_cache(maxsize=8)
+def get_phrase_pattern(remove_phrases: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    """Compiles the leading-phrase pattern once per distinct phrase list."""
+    phrases = [phrase for phrase in remove_phrases if phrase]
+    if not phrases:
+        return None
+    # Repeat the group so stacked phrases ("The image shows A painting of ...") go in one pass
+    alternatives = "|".join(re.escape(phrase) for phrase in phrases)
+    return re.compile(rf"^(?:(?:{alternatives})\s*)+", re.IGNORECASE)
+
+def clean_caption(caption: str, caption_config: Dict[str, Any]) -> str:
+    """Removes unwanted leading phrases and capitalizes the caption."""
+    processed_caption = caption.strip()
+    
+    # Remove unwanted phrases from the beginning
+    pattern = get_phrase_pattern(tuple(caption_config.get("remove_phrases") or ()))
+    if pattern is not None:
+        match = pattern.match(processed_caption)
+        if match:
+            logging.debug(f"Removed phrases: {match.group(0).strip()!r}")
+            processed_caption = processed_caption[match.end():].strip()
+    
+    # Capitalize the first letter if needed
+    if processed_caption and processed_caption[0].islower():
+        processed_caption = processed_caption[0].upper() + processed_caption[1:]
+    
+    return processed_caption
+
+def get_torch_dtype(device: str) -> torch.dtype:
+    """Returns the inference dtype for the given device."""
+    if device != "cuda":
+        return torch.float32
+    # bfloat16 keeps float32's exponent range, avoiding fp16 overflow in the decoder
+    return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+
+def build_generation_config(model, caption_config: Dict[str, Any]) -> GenerationConfig:
+    """Builds the greedy-search generation config once from the model defaults."""
+    # Start from the decoder's own config so special token ids are preserved
+    decoder = getattr(model, "language_model", model)
+    generation_config = copy.deepcopy(decoder.generation_config)
+    if generation_config.pad_token_id is None:
+        generation_config.pad_token_id = decoder.config.pad_token_id
+    generation_config.update(
+        max_new_tokens=caption_config.get("max_new_tokens", 1024),
+        do_sample=caption_config.get("do_sample", False),
+        use_cache=caption_config.get("use_cache", True),
+        num_beams=1,  # Simple greedy search to avoid beam search issues
+        early_stopping=True
+    )
+    return generation_config
+
+def encode_batch(model, input_ids: torch.Tensor, pixel_values: torch.Tensor) -> Optional[BaseModelOutput]:
+    """
+    Runs the vision tower and text encoder once for a batch, mirroring what
+    Florence-2's generate() does internally. Returns None if the model doesn't
+    expose the pieces needed to do this outside of generate().
+    """
+    decoder = getattr(model, "language_model", None)
+    if decoder is None or not hasattr(model, "_encode_image") or not hasattr(model, "_merge_input_ids_with_image_features"):
+        return None
+    inputs_embeds = model.get_input_embeddings()(input_ids)
+    image_features = model._encode_image(pixel_values)
+    inputs_embeds, _ = model._merge_input_ids_with_image_features(image_features, inputs_embeds)
+    return decoder.get_encoder()(inputs_embeds=inputs_embeds, return_dict=True)
+
+def generate_ids(model, input_ids: torch.Tensor, pixel_values: torch.Tensor,
+                 generation_config: GenerationConfig, round_tokens: int = 0) -> List[torch.Tensor]:
+    """
+    Runs greedy decoding for a batch and returns one id sequence per row.
+    With round_tokens set, decoding proceeds in rounds of that many tokens and
+    rows that emitted EOS are dropped between rounds, so short captions don't
+    keep paying for the longest one. The encoder runs once; each round resumes
+    the remaining rows from the tokens they already produced.
+    """
+    max_new_tokens = generation_config.max_new_tokens
+    batch_size = input_ids.shape[0]
+    encoder_outputs = None
+    if round_tokens and round_tokens < max_new_tokens and batch_size > 1:
+        encoder_outputs = encode_batch(model, input_ids, pixel_values)
+    if encoder_outputs is None:
+        return list(model.generate(input_ids=input_ids, pixel_values=pixel_values, generation_config=generation_config))
+    
+    decoder = model.language_model
+    eos_token_id = generation_config.eos_token_id
+    eos_ids = torch.tensor(eos_token_id if isinstance(eos_token_id, list) else [eos_token_id], device=input_ids.device)
+    
+    results = [None] * batch_size
+    active = torch.arange(batch_size, device=input_ids.device)
+    prefix = None
+    remaining = max_new_tokens
+    round_config = copy.deepcopy(generation_config)
+    forced_eos_token_id = generation_config.forced_eos_token_id
+    # Newer transformers fill unset values from the decoder's own generation_config,
+    # so the forced EOS has to be cleared there as well for the intermediate rounds
+    default_config = decoder.generation_config
+    default_forced_eos_token_id = default_config.forced_eos_token_id
+    
+    try:
+        while len(active) > 0:
+            round_config.max_new_tokens = min(round_tokens, remaining)
+            # BART-style configs force EOS at max_length; only the round that reaches the
+            # real token limit may do that, or every caption would end after one round
+            last_round = round_config.max_new_tokens >= remaining
+            round_config.forced_eos_token_id = forced_eos_token_id if last_round else None
+            default_config.forced_eos_token_id = default_forced_eos_token_id if last_round else None
+            kwargs = {}
+            if prefix is not None:
+                kwargs["decoder_input_ids"] = prefix
+            sequences = decoder.generate(
+                encoder_outputs=BaseModelOutput(last_hidden_state=encoder_outputs.last_hidden_state[active]),
+                generation_config=round_config,
+                **kwargs
+            )
+            remaining -= sequences.shape[1] - (prefix.shape[1] if prefix is not None else 1)
+            
+            # The decoder starts from EOS, so ignore position 0 when checking for completion
+            finished = torch.isin(sequences[:, 1:], eos_ids).any(dim=1)
+            if remaining <= 0:
+                finished[:] = True
+            for row, sequence in zip(active[finished].tolist(), sequences[finished]):
+                results[row] = sequence
+            
+            # Unfinished rows have no padding, so their sequences can be resumed as-is
+            active = active[~finished]
+            prefix = sequences[~finished]
+    finally:
+        default_config.forced_eos_token_id = default_forced_eos_token_id
+    
+    return results
+
+def encode_prompt(processor, prompt: str) -> torch.Tensor:
+    """Tokenizes the task prompt once; it is identical for every image."""
+    # The processor expands task tokens like <MORE_DETAILED_CAPTION> into the
+    # actual instruction text, so go through it rather than the raw tokenizer
+    placeholder = Image.new("RGB", (32, 32))
+    return processor(text=prompt, images=placeholder, return_tensors="pt")["input_ids"]
+
+def generate_captions_batch(model, processor, image_paths: List[Path], device: str, caption_config: Dict[str, Any],
+                            torch_dtype: Optional[torch.dtype] = None,
+                            generation_config: Optional[GenerationConfig] = None,
+                            prompt_ids: Optional[torch.Tensor] = None,
+                            image_futures: Optional[List[Future]] = None,
+                            autocast_dtype: Optional[torch.dtype] = None,
+                            resize_to: Optional[Tuple[int, int]] = None) -> List[str]:
+    """Generates captions for a batch of images with a single Florence-2 generate call."""
+    captions = [None] * len(image_paths)
+    
+    # Open images individually so one unreadable file doesn't fail the whole batch
+    images = []
+    indices = []
+    for idx, image_path in enumerate(image_paths):
+        try:
+            if image_futures is not None:
+                images.append(image_futures[idx].result())
+            else:
+                images.append(load_image(image_path, resize_to))
+            indices.append(idx)
+        except Exception as e:
+            logging.error(f"Error opening {image_path}: {e}")
+            captions[idx] = f"Error: {str(e)}"
+    
+    if not images:
+        return captions
+    
+    # Get Florence-2 captioning prompt from config
+    prompt = caption_config.get("prompt", "<MORE_DETAILED_CAPTION>")
+    
     try:
-        image = Image.open(image_path).convert("RGB")
+        # Fall back to per-call setup when used outside of main()
+        if torch_dtype is None:
+            torch_dtype = get_torch_dtype(device)
+        if generation_config is None:
+            generation_config = build_generation_config(model, caption_config)
+        if prompt_ids is None:
+            prompt_ids = encode_prompt(processor, prompt)
         
-        # Get Florence-2 captioning prompt from config
-        prompt = caption_config.get("prompt", "<MORE_DETAILED_CAPTION>")
+        # Only the pixels change per image; reuse the pre-tokenized prompt for every row
+        # Images pre-resized on the decode workers skip the processor's single-threaded resize
+        pixel_values = processor.image_processor(images, return_tensors="pt", do_resize=resize_to is None)["pixel_values"]
+        input_ids = prompt_ids.expand(len(images), -1).to(device)
         
-        # Determine torch_dtype
-        torch_dtype = torch.float16 if device == "cuda" else torch.float32
+        if device == "cuda":
+            # Pinned host memory lets the copies run asynchronously to the GPU
+            pixel_values = pixel_values.pin_memory().to(device, torch_dtype, non_blocking=True)
+            # Matches the channels_last vision tower set up in main()
+            pixel_values = pixel_values.contiguous(memory_format=torch.channels_last)
+        else:
+            pixel_values = pixel_values.to(device, torch_dtype)
         
-        # Process the image
-        inputs = processor(text=prompt, images=image, return_tensors="pt")
+        with torch.inference_mode(), torch.autocast(device_type=device, dtype=autocast_dtype,
+                                                    enabled=autocast_dtype is not None):
+            generated_ids = generate_ids(
+                model,
+                input_ids,
+                pixel_values,
+                generation_config,
+                round_tokens=caption_config.get("decode_round_tokens", 128)
+            )
         
-        # Move inputs to device with proper dtype - check for None first
-        inputs_to_device = {}
-        for k, v in inputs.items():
-            if v is not None:
-                if hasattr(v, 'dtype') and v.dtype.is_floating_point:
-                    inputs_to_device[k] = v.to(device, torch_dtype)
-                else:
-                    inputs_to_device[k] = v.to(device)
+        # Decode all generated texts at once; plain caption tasks only need the special
+        # tokens stripped, so skip Florence-2's task-specific post-processing for them
+        plain_caption = prompt in PLAIN_CAPTION_TASKS
+        generated_texts = processor.batch_decode(generated_ids, skip_special_tokens=plain_caption)
+    except Exception as e:
+        logging.error(f"Error in generate_captions_batch: {e}")
+        for idx in indices:
+            captions[idx] = f"Error: {str(e)}"
+        return captions
+    
+    for idx, generated_text, image in zip(indices, generated_texts, images):
+        try:
+            if plain_caption:
+                caption = generated_text
             else:
-                inputs_to_device[k] = v
-        
-        # Generate caption - use simple greedy search to avoid beam search issues
-        generated_ids = model.generate(
-            input_ids=inputs_to_device["input_ids"],
-            pixel_values=inputs_to_device["pixel_values"],
-            max_new_tokens=caption_config.get("max_new_tokens", 1024),
-            do_sample=caption_config.get("do_sample", False),
-            use_cache=caption_config.get("use_cache", False)  # Disable cache to avoid past_key_values issues
+                # Parse the output using Florence-2's post-processing
+                parsed_answer = processor.post_process_generation(
+                    generated_text, 
+                    task=prompt, 
+                    image_size=(image.width, image.height)
+                )
+                
+                # Extract the caption text
+                caption = parsed_answer.get(prompt, "")
+            if isinstance(caption, list):
+                caption = caption[0] if caption else ""
+            if isinstance(caption, str) and caption.strip():
+                captions[idx] = clean_caption(caption, caption_config)
+            else:
+                captions[idx] = "Unable to generate caption"
+        except Exception as e:
+            logging.error(f"Error in generate_captions_batch: {e}")
+            captions[idx] = f"Error: {str(e)}"
+    
+    return captions
+
+def generate_caption(model, processor, image_path: Path, device: str, caption_config: Dict[str, Any]) -> str:
+    """Generates a caption for a single image using Florence-2."""
+    return generate_captions_batch(model, processor, [image_path], device, caption_config)[0]
+
+def get_quantization_config(caption_config: Dict[str, Any], device: str) -> Optional[BitsAndBytesConfig]:
+    """Builds a bitsandbytes quantization config if enabled in the caption settings."""
+    if device != "cuda":
+        if caption_config.get("load_in_8bit", False) or caption_config.get("load_in_4bit", False):
+            logging.warning("Quantized loading requires CUDA, loading full-precision weights instead.")
+        return None
+    
+    if caption_config.get("load_in_4bit", False):
+        logging.info("Loading model weights in 4-bit (NF4)")
+        return BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=get_torch_dtype(device)
+        )
+    if caption_config.get("load_in_8bit", False):
+        logging.info("Loading model weights in 8-bit (LLM.int8)")
+        return BitsAndBytesConfig(load_in_8bit=True)
+    return None
+
+def load_model(model_id: str, attn_implementation: str, **kwargs):
+    """Loads the model, falling back to eager attention if the model code rejects the requested one."""
+    try:
+        return AutoModelForCausalLM.from_pretrained(
+            model_id, trust_remote_code=True, attn_implementation=attn_implementation, **kwargs
+        )
+    except (ValueError, ImportError) as e:
+        if attn_implementation == "eager":
+            raise
+        logging.warning(f"Attention implementation '{attn_implementation}' is not supported ({e}), using 'eager'")
+        return AutoModelForCausalLM.from_pretrained(
+            model_id, trust_remote_code=True, attn_implementation="eager", **kwargs
         )
+
+class Captioner:
+    """Loads Florence-2 once and captions batches of images in-process."""
+    
+    def __init__(self, caption_config: Dict[str, Any], device: str):
+        self.caption_config = caption_config
+        self.device = device
         
-        # Decode the generated text
-        generated_text = processor.batch_decode(generated_ids, skip_special_tokens=False)[0]
+        # Load Florence-2 model from config
+        model_id = caption_config.get("model_id", "microsoft/Florence-2-large")
+        self.prompt = caption_config.get("prompt", "<MORE_DETAILED_CAPTION>")
+        logging.info(f"Loading Florence-2 model: {model_id}")
+        logging.info(f"Using caption prompt: {self.prompt}")
         
-        # Parse the output using Florence-2's post-processing
-        parsed_answer = processor.post_process_generation(
-            generated_text, 
-            task=prompt, 
-            image_size=(image.width, image.height)
-        )
+        # Determine torch_dtype
+        self.torch_dtype = get_torch_dtype(device)
+        
+        # "sdpa" uses fused attention kernels; fall back to "eager" if the model code rejects it
+        attn_implementation = caption_config.get("attn_implementation", "sdpa")
+        logging.info(f"Using attention implementation: {attn_implementation}")
         
-        # Extract the caption text
-        caption = parsed_answer.get(prompt, "")
-        if isinstance(caption, str):
-            processed_caption = caption.strip()
-        elif isinstance(caption, list) and len(caption) > 0:
-            processed_caption = caption[0].strip()
+        self.processor = AutoProcessor.from_pretrained(model_id, trust_remote_code=True)
+        quantization_config = get_quantization_config(caption_config, device)
+        if quantization_config is not None:
+            # bitsandbytes handles weight placement, so no explicit .to(device)
+            model = load_model(
+                model_id,
+                attn_implementation,
+                quantization_config=quantization_config,
+                # Modules left unquantized must match the dtype the inputs are cast to
+                torch_dtype=self.torch_dtype,
+                device_map="auto"
+            )
+        elif device == "cuda":
+            # Load weights straight onto the GPU; a trailing .to() would copy them again
+            model = load_model(
+                model_id,
+                attn_implementation,
+                torch_dtype=self.torch_dtype,
+                device_map={"": 0}
+            )
         else:
-            return "Unable to generate caption"
+            model = load_model(
+                model_id,
+                attn_implementation,
+                torch_dtype=self.torch_dtype
+            ).to(device)
         
-        # Remove unwanted phrases from the beginning (iteratively)
-        remove_phrases = caption_config.get("remove_phrases", [])
-        original_caption = processed_caption
+        # Only set when running the CPU fallback through IPEX
+        self.autocast_dtype = None
+        if device == "cpu" and ipex is not None:
+            # ipex.llm.optimize only knows specific LLM architectures; the generic
+            # optimizer handles Florence-2's remote code and fuses its linears
+            logging.info("Optimizing model for CPU with Intel Extension for PyTorch (bfloat16)")
+            model.eval()
+            model = ipex.optimize(model, dtype=torch.bfloat16)
+            self.autocast_dtype = torch.bfloat16
         
-        # Keep trying to remove phrases until no more matches are found
-        phrases_removed = []
-        changed = True
-        while changed:
-            changed = False
-            for phrase in remove_phrases:
-                if processed_caption.lower().startswith(phrase.lower()):
-                    # Remove the phrase and clean up the result
-                    processed_caption = processed_caption[len(phrase):].strip()
-                    phrases_removed.append(phrase)
-                    changed = True
-                    break  # Start over from the beginning to handle nested phrases
+        vision_tower = getattr(model, "vision_tower", None)
+        if device == "cuda" and quantization_config is None and vision_tower is not None:
+            # The convolutional patch embeddings run faster on Tensor Cores in NHWC layout
+            vision_tower.to(memory_format=torch.channels_last)
         
-        # Capitalize the first letter if needed
-        if processed_caption and processed_caption[0].islower():
-            processed_caption = processed_caption[0].upper() + processed_caption[1:]
+        if device == "cuda" and caption_config.get("compile_model", False):
+            # Florence-2's generate() drives the text decoder's forward once per token,
+            # so that is the part worth compiling; CUDA graphs remove the launch overhead
+            logging.info("Compiling text decoder with torch.compile (reduce-overhead)")
+            decoder = getattr(model, "language_model", model)
+            decoder.forward = torch.compile(decoder.forward, mode="reduce-overhead", fullgraph=False)
         
-        if phrases_removed:
-            logging.debug(f"Removed phrases: {phrases_removed}")
+        self.model = model
         
-        return processed_caption
-            
-    except Exception as e:
-        logging.error(f"Error in generate_caption: {e}")
-        return f"Error: {str(e)}"
+        # Per-run inference state, built once and shared by every batch
+        self.generation_config = build_generation_config(model, caption_config)
+        self.prompt_ids = encode_prompt(self.processor, self.prompt)
+        
+        # Resize on the decode workers for plain captions; region tasks need the
+        # original image size for post-processing, so leave those to the processor
+        self.resize_to = get_processor_image_size(self.processor) if self.prompt in PLAIN_CAPTION_TASKS else None
+        
+        num_workers = caption_config.get("num_workers") or max(1, (os.cpu_count() or 2) // 2)
+        self.executor = ThreadPoolExecutor(max_workers=num_workers)
+    
+    def caption_chunks(self, chunks: Iterator[List[Path]]) -> Iterator[Tuple[List[Path], List[str]]]:
+        """Yields (chunk, captions) for each chunk of image paths."""
+        # Decode upcoming batches on worker threads while the current one is on the GPU
+        for chunk, image_futures in prefetch_images(self.executor, chunks, depth=2, resize_to=self.resize_to):
+            try:
+                captions = generate_captions_batch(
+                    self.model, self.processor, chunk, self.device, self.caption_config,
+                    torch_dtype=self.torch_dtype,
+                    generation_config=self.generation_config,
+                    prompt_ids=self.prompt_ids,
+                    image_futures=image_futures,
+                    autocast_dtype=self.autocast_dtype,
+                    resize_to=self.resize_to
+                )
+            except Exception as e:
+                captions = [f"Error: {str(e)}"] * len(chunk)
+            yield chunk, captions
+    
+    def close(self) -> None:
+        """Stops the image decode workers."""
+        self.executor.shutdown()
+
+class RemoteCaptioner:
+    """
+    Forwards caption requests to a running caption server over a UNIX socket.
+    The server captions with its own caption settings; the client's are not sent.
+    """
+    
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+    
+    def caption(self, image_paths: List[Path]) -> List[str]:
+        """Sends one batch of image paths and returns their captions in order."""
+        paths = [str(image_path.resolve()) for image_path in image_paths]
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket_path)
+            client.sendall((json.dumps({"paths": paths}) + "\n").encode("utf-8"))
+            response = b""
+            while not response.endswith(b"\n"):
+                data = client.recv(65536)
+                if not data:
+                    break
+                response += data
+        result = json.loads(response.decode("utf-8"))
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return [result["captions"].get(path, "Error: missing from server response") for path in paths]
+    
+    def caption_chunks(self, chunks: Iterator[List[Path]]) -> Iterator[Tuple[List[Path], List[str]]]:
+        """Yields (chunk, captions) for each chunk of image paths."""
+        for chunk in chunks:
+            try:
+                captions = self.caption(chunk)
+            except Exception as e:
+                captions = [f"Error: {str(e)}"] * len(chunk)
+            yield chunk, captions
+    
+    def close(self) -> None:
+        """Nothing to release; connections are per request."""
+
+def server_available(socket_path: str) -> bool:
+    """Checks whether a caption server owned by the current user is listening on the socket."""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return False
+    # Never send image paths to a socket another user could have created
+    if hasattr(os, "getuid") and os.stat(socket_path).st_uid != os.getuid():
+        logging.warning(f"Ignoring caption server socket {socket_path}: owned by another user")
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def run_server(captioner: Captioner, socket_path: str, batch_size: int) -> None:
+    """Keeps the model resident and serves caption requests until interrupted."""
+    # A single worker serializes GPU work across concurrent clients
+    gpu_executor = ThreadPoolExecutor(max_workers=1)
+    
+    def caption_paths(image_paths: List[Path]) -> Dict[str, str]:
+        captions = {}
+        for chunk, chunk_captions in captioner.caption_chunks(chunked(image_paths, batch_size)):
+            for image_path, caption in zip(chunk, chunk_captions):
+                captions[str(image_path)] = caption
+        return captions
+    
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        line = await reader.readline()
+        if not line:
+            # Availability probe from server_available()
+            writer.close()
+            return
+        try:
+            request = json.loads(line.decode("utf-8"))
+            image_paths = [Path(path) for path in request["paths"]]
+            logging.info(f"Captioning {len(image_paths)} images")
+            loop = asyncio.get_running_loop()
+            response = {"captions": await loop.run_in_executor(gpu_executor, caption_paths, image_paths)}
+        except Exception as e:
+            logging.error(f"Error handling request: {e}")
+            response = {"error": str(e)}
+        writer.write((json.dumps(response) + "\n").encode("utf-8"))
+        await writer.drain()
+        writer.close()
+    
+    async def serve() -> None:
+        # Create the socket owner-only from the start, then make sure of the mode
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(handle, path=socket_path, limit=16 * 1024 * 1024)
+        finally:
+            os.umask(old_umask)
+        os.chmod(socket_path, 0o600)
+        logging.info(f"Caption server listening on {socket_path} (Ctrl+C to stop)")
+        async with server:
+            await server.serve_forever()
+    
+    # Remove a socket left behind by a server that didn't shut down cleanly,
+    # but never one that a running server still answers on
+    if os.path.exists(socket_path):
+        if server_available(socket_path):
+            logging.error(f"A caption server is already running on {socket_path}")
+            sys.exit(1)
+        os.remove(socket_path)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        logging.info("\nCaption server stopped.")
+    finally:
+        gpu_executor.shutdown()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
 
 def main():
     """Main function."""
@@ -136,14 +641,18 @@ Examples:
   python generate_captions.py datasets/mymodel/1024x1024
   python generate_captions.py /path/to/images --config custom_config.yaml
   python generate_captions.py datasets/aigarasch/512x512 --log-level DEBUG
+  python generate_captions.py --server
 
 The script generates .txt caption files for all images in the specified directory.
+If a caption server started with --server is running, the model is not reloaded
+and captions are requested from the server instead.
         """
     )
     
     parser.add_argument(
         'input_directory',
-        help='Path to the directory containing images to caption (required)'
+        nargs='?',
+        help='Path to the directory containing images to caption (required unless --server)'
     )
     
     parser.add_argument(
@@ -159,40 +668,54 @@ The script generates .txt caption files for all images in the specified director
         choices=["DEBUG", "INFO", "WARNING", "ERROR"],
         help="Logging level (default: INFO).",
     )
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="Keep the model loaded and serve caption requests on --socket, using this config's caption settings.",
+    )
+    parser.add_argument(
+        "--client",
+        action="store_true",
+        help="Require a running caption server instead of loading the model locally.",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=DEFAULT_SOCKET_PATH,
+        help=f"UNIX socket path of the caption server (default: {DEFAULT_SOCKET_PATH}).",
+    )
     args = parser.parse_args()
     setup_logging(args.log_level)
-
-    # Check if input directory exists
-    if not os.path.exists(args.input_directory):
-        logging.error(f"Input directory does not exist: {args.input_directory}")
+    
+    if (args.server or args.client) and not hasattr(socket, "AF_UNIX"):
+        logging.error("Server mode requires UNIX socket support, which this platform lacks.")
         sys.exit(1)
 
     config = load_config(args.config)
     caption_config = config.get("caption", {})
+    batch_size = max(1, int(caption_config.get("batch_size", 8)))
     
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    logging.info(f"Using device: {device}")
-
-    # Load Florence-2 model from config
-    model_id = caption_config.get("model_id", "microsoft/Florence-2-large")
-    prompt = caption_config.get("prompt", "<MORE_DETAILED_CAPTION>")
-    logging.info(f"Loading Florence-2 model: {model_id}")
-    logging.info(f"Using caption prompt: {prompt}")
-    
-    # Determine torch_dtype
-    torch_dtype = torch.float16 if device == "cuda" else torch.float32
-    
-    processor = AutoProcessor.from_pretrained(model_id, trust_remote_code=True)
-    model = AutoModelForCausalLM.from_pretrained(
-        model_id,
-        torch_dtype=torch_dtype,
-        trust_remote_code=True,
-        device_map="auto" if device == "cuda" else None,
-        attn_implementation="eager"  # Force eager attention to avoid SDPA issues
-    ).to(device)
+    if args.server:
+        # Check before loading the model; run_server checks again before removing a stale socket
+        if server_available(args.socket):
+            logging.error(f"A caption server is already running on {args.socket}")
+            sys.exit(1)
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logging.info(f"Using device: {device}")
+        captioner = Captioner(caption_config, device)
+        try:
+            run_server(captioner, args.socket, batch_size)
+        finally:
+            captioner.close()
+        return
     
-    if device != "cuda":
-        model = model.to(device)
+    if args.input_directory is None:
+        parser.error("input_directory is required unless --server is given")
+
+    # Check if input directory exists
+    if not os.path.exists(args.input_directory):
+        logging.error(f"Input directory does not exist: {args.input_directory}")
+        sys.exit(1)
 
     # Process the specified directory
     input_dir = Path(args.input_directory)
@@ -221,28 +744,68 @@ The script generates .txt caption files for all images in the specified director
     
     logging.info(f"Found {total_files} image files")
     
+    # Split off already-captioned images first so batches only hold pending work
+    existing_captions = get_caption_stems(input_dir)
+    pending_files = []
+    # Inputs sharing a stem (a.jpg, a.png) write the same caption file, so only the first is queued
+    queued_stems = {}
     for i, image_path in enumerate(image_files, 1):
-        caption_path = image_path.with_suffix(".txt")
-        
-        if caption_path.exists():
+        if image_path.stem in existing_captions:
             logging.info(f"({i}/{total_files}) Caption already exists for {image_path.name}, skipping.")
             skipped_count += 1
             continue
-
-        logging.info(f"({i}/{total_files}) Generating caption for {image_path.name}...")
+        if image_path.stem in queued_stems:
+            logging.warning(f"({i}/{total_files}) Skipping {image_path.name}: same caption file as "
+                            f"{queued_stems[image_path.stem].name}")
+            skipped_count += 1
+            continue
+        queued_stems[image_path.stem] = image_path
+        pending_files.append(image_path)
+    
+    if not pending_files:
+        logging.info(f"All {skipped_count} images already have captions, nothing to do.")
+        return
+    
+    if server_available(args.socket):
+        logging.info(f"Using caption server at {args.socket} (with the server's caption settings)")
+        captioner = RemoteCaptioner(args.socket)
+    elif args.client:
+        logging.error(f"No caption server is running at {args.socket}")
+        sys.exit(1)
+    else:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logging.info(f"Using device: {device}")
+        captioner = Captioner(caption_config, device)
+    
+    done_count = skipped_count
+    
+    # Write caption files on a separate thread so slow filesystems don't stall the GPU
+    write_queue = queue.Queue()
+    write_failures = []
+    writer = threading.Thread(target=write_captions, args=(write_queue, write_failures))
+    writer.start()
+    
+    try:
+        for chunk, captions in captioner.caption_chunks(chunked(pending_files, batch_size)):
+            logging.info(f"({done_count + 1}-{done_count + len(chunk)}/{total_files}) Captioned {len(chunk)} images")
+            for image_path, caption in zip(chunk, captions):
+                done_count += 1
+                if not caption.startswith("Error:"):
+                    write_queue.put((image_path.with_suffix(".txt"), caption))
+                    logging.info(f"{image_path.name}: {caption}")
+                    processed_count += 1
+                else:
+                    logging.error(f"  -> Failed ({image_path.name}): {caption}")
+                    error_count += 1
+    finally:
+        # Flush captions already queued even on Ctrl+C or an error
         try:
-            caption = generate_caption(model, processor, image_path, device, caption_config)
-            if not caption.startswith("Error:"):
-                with open(caption_path, "w", encoding="utf-8") as f:
-                    f.write(caption)
-                logging.info(f"{caption}")
-                processed_count += 1
-            else:
-                logging.error(f"  -> Failed: {caption}")
-                error_count += 1
-        except Exception as e:
-            logging.error(f"  -> Failed to generate caption for {image_path.name}: {e}")
-            error_count += 1
+            captioner.close()
+        finally:
+            write_queue.put(None)
+            writer.join()
+    processed_count -= len(write_failures)
+    error_count += len(write_failures)
     
     # Summary
     logging.info(f"\nCaption generation completed!")
@@ -6,13 +6,105 @@ A GUI application for comparing images and ranking them using ELO ratings.
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import PIL
 from PIL import Image, ImageTk
+import numpy as np
 import os
 import random
 import json
 import math
-from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+import hashlib
+import tempfile
+import base64
+import queue
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple, Optional
+
+# Optional: faster JSON for large rankings files (pip install orjson)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: rankings kept in order as ratings change (pip install sortedcontainers)
+try:
+    from sortedcontainers import SortedList
+except ImportError:
+    SortedList = None
+
+# Optional: JIT-compiled history replay (pip install numba)
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# Supported image formats (lowercase, without the dot)
+SUPPORTED_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'bmp', 'gif', 'tiff', 'webp'})
+
+
+def is_pillow_simd() -> bool:
+    """Pillow-SIMD releases carry a '.postN' suffix on the Pillow version they track."""
+    return 'post' in PIL.__version__
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _elo_replay(ratings, winners, losers, k_factor, exp_table):
+        """Replay each row's (winner, loser) index sequence on that row of ratings, in place.
+        
+        exp_table holds the expected winner score for rating differences
+        -m..m, as ImageComparator._EXP_TABLE.
+        """
+        max_diff = (exp_table.size - 1) // 2
+        for row in range(ratings.shape[0]):
+            for step in range(winners.shape[1]):
+                w = winners[row, step]
+                l = losers[row, step]
+                offset = min(max_diff, max(-max_diff, int(np.rint(ratings[row, l] - ratings[row, w]))))
+                expected_winner = exp_table[offset + max_diff]
+                delta = k_factor * (1.0 - expected_winner)
+                ratings[row, w] += delta
+                ratings[row, l] -= delta
+else:
+    _elo_replay = None
+
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    """Write data as indented JSON, using orjson when available."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def read_json(path: str) -> Dict[str, Any]:
+    """Read a JSON file, using orjson when available."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+def iter_image_files(root: str) -> Iterator[str]:
+    """Recursively yield supported image paths under root, skipping hidden directories."""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            # Skip unreadable directories (e.g. no permission) like rglob does
+            continue
+        with entries:
+            for entry in entries:
+                # is_dir/is_file use the directory entry's cached type, so no extra stat
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.'):
+                        stack.append(entry.path)
+                elif entry.name.rpartition('.')[2].lower() in SUPPORTED_EXTENSIONS and entry.is_file():
+                    yield entry.path
 
 
 class ImageComparator:
@@ -25,30 +117,103 @@ class ImageComparator:
         # Data storage
         self.images_dir: Optional[str] = None
         self.image_files: List[str] = []
-        self.ratings: Dict[str, float] = {}  # filename -> ELO rating
+        # Ratings store: parallel arrays indexed by self._idx[filename]
+        self._names: List[str] = []
+        self._idx: Dict[str, int] = {}
+        self._R: np.ndarray = np.empty(0)  # ELO ratings
+        self._C: np.ndarray = np.empty(0, dtype=np.int64)  # times compared
+        self._image_idx: np.ndarray = np.empty(0, dtype=np.intp)  # store index of each loaded image
+        self._idx_paths: Dict[int, List[str]] = {}  # store index -> loaded paths with that filename
+        self._ranked: Optional["SortedList"] = None  # store indices of loaded images, best first
         self.comparison_history: List[Tuple[str, str]] = []  # Track compared pairs
+        self.match_history: List[Tuple[str, str]] = []  # (winner, loser) in play order
+        self._pair_counts: Counter = Counter()  # sorted pair -> times compared
+        self._basename: Dict[str, str] = {}  # image path -> filename
         
         # Current comparison state
         self.current_left_image: Optional[str] = None
         self.current_right_image: Optional[str] = None
-        self.left_photo: Optional[ImageTk.PhotoImage] = None
-        self.right_photo: Optional[ImageTk.PhotoImage] = None
+        self.left_photo: Optional[tk.PhotoImage] = None
+        self.right_photo: Optional[tk.PhotoImage] = None
+        # Next pair chosen during the winner feedback delay: (left, right, decode futures)
+        self._next_pair: Optional[Tuple[str, str, Tuple[Future, Future]]] = None
         
         # Rankings view state
-        self.preview_photo: Optional[ImageTk.PhotoImage] = None
+        self.preview_photo: Optional[tk.PhotoImage] = None
         self.selected_image_path: Optional[str] = None
+        self._ranking_view: Optional[ttk.Frame] = None  # Built once, hidden while comparing
         
         # UI state
         self.current_view = "comparison"  # "comparison" or "ranking"
         
         # Constants
         self.INITIAL_ELO = 1500
+        self.RATING_COLORS = ("green", "red", "black")  # above, below, near initial rating
         self.K_FACTOR = 32
+        # Expected winner score by rounded rating difference (loser - winner), clamped to +-800
+        self.ELO_MAX_DIFF = 800
+        self._EXP_TABLE = 1.0 / (1.0 + 10.0 ** (np.arange(-self.ELO_MAX_DIFF, self.ELO_MAX_DIFF + 1) / 400.0))
         self.IMAGE_SIZE = (400, 400)
         self.THUMBNAIL_SIZE = (100, 100)
+        self.RANKING_ROW_HEIGHT = 124  # Thumbnail plus padding and border
+        self.THUMB_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "image-comparator", "thumbs")
+        self.THUMB_CACHE_SIZE = 512  # PhotoImages kept in memory
+        
+        # Thumbnail cache: (path, mtime, size) -> PhotoImage, least recently used first
+        self._thumb_cache: "OrderedDict[Tuple[str, float, Tuple[int, int]], ImageTk.PhotoImage]" = OrderedDict()
+        
+        # Background thumbnail decoding; results are handed back to the Tk thread via a queue
+        self._thumb_pool = ThreadPoolExecutor(max_workers=max(2, (os.cpu_count() or 2) // 2))
+        self._thumb_futures: List[Future] = []
+        self._thumb_results: "queue.Queue[Tuple[Optional[ttk.Label], Tuple[str, float, Tuple[int, int]], Future]]" = queue.Queue()
+        self._thumb_pending = 0
+        self._thumb_drain_scheduled = False
+        self._thumb_prefetching: set = set()  # keys queued for read-ahead
+        self._thumb_waiting: Dict[Tuple[str, float, Tuple[int, int]], List[ttk.Label]] = {}  # labels waiting on read-ahead
         
         self.setup_ui()
         self.bind_keyboard_events()
+    
+    @property
+    def ratings(self) -> Dict[str, float]:
+        """Ratings as a filename -> ELO dict, for import/export."""
+        return {name: float(rating) for name, rating in zip(self._names, self._R)}
+    
+    @ratings.setter
+    def ratings(self, ratings: Dict[str, float]):
+        self._names = list(ratings)
+        self._idx = {name: i for i, name in enumerate(self._names)}
+        self._R = np.fromiter(ratings.values(), dtype=float, count=len(self._names))
+        self._C = np.zeros(len(self._names), dtype=np.int64)
+        self.initialize_ratings()
+        self.rebuild_comparison_counts()
+    
+    def add_rated_images(self, filenames) -> None:
+        """Append filenames that are not rated yet at the initial rating."""
+        new = [name for name in dict.fromkeys(filenames) if name not in self._idx]
+        if not new:
+            return
+        self._idx.update((name, i) for i, name in enumerate(new, len(self._names)))
+        self._names.extend(new)
+        self._R = np.concatenate([self._R, np.full(len(new), float(self.INITIAL_ELO))])
+        self._C = np.concatenate([self._C, np.zeros(len(new), dtype=np.int64)])
+    
+    def rebuild_comparison_counts(self) -> None:
+        """Recount per-image comparisons from the comparison history."""
+        self.add_rated_images(name for pair in self.comparison_history for name in pair)
+        self._C = np.zeros(len(self._names), dtype=np.int64)
+        if self.comparison_history:
+            np.add.at(self._C, [self._idx[name] for pair in self.comparison_history for name in pair], 1)
+    
+    def get_rating(self, filename: str) -> float:
+        """Current ELO rating of an image."""
+        i = self._idx.get(filename)
+        return self.INITIAL_ELO if i is None else float(self._R[i])
+    
+    def get_comparison_count(self, filename: str) -> int:
+        """Number of comparisons an image has taken part in."""
+        i = self._idx.get(filename)
+        return 0 if i is None else int(self._C[i])
         
     def setup_ui(self):
         """Initialize the user interface."""
@@ -99,6 +264,7 @@ class ImageComparator:
         file_menu.add_separator()
         file_menu.add_command(label="Export Rankings...", command=self.export_rankings)
         file_menu.add_command(label="Import Rankings...", command=self.import_rankings)
+        file_menu.add_command(label="Recalculate Ratings", command=self.recalculate_ratings)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         
@@ -109,9 +275,8 @@ class ImageComparator:
     
     def create_comparison_view(self):
         """Create the side-by-side image comparison interface."""
-        # Clear content frame
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.cancel_thumbnail_loads()
+        self.clear_content_frame()
             
         # Instructions
         instructions = ttk.Label(self.content_frame, 
@@ -186,47 +351,62 @@ class ImageComparator:
         self.create_ranking_view()
         
     def create_ranking_view(self):
-        """Create the rankings display with thumbnails and scores."""
-        # Clear content frame
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        """Show the rankings display with thumbnails and scores."""
+        self.cancel_thumbnail_loads()
+        self.clear_content_frame()
             
         if not self.image_files:
             ttk.Label(self.content_frame, text="No images loaded. Please select a directory first.", 
                      font=("Arial", 14)).pack(expand=True)
             return
         
+        if self._ranking_view is None:
+            self.build_ranking_view()
+        self._ranking_view.pack(fill=tk.BOTH, expand=True)
+        self.refresh_ranking_list()
+    
+    def clear_content_frame(self):
+        """Remove the current view, keeping the rankings scaffold for reuse."""
+        for widget in self.content_frame.winfo_children():
+            if widget is self._ranking_view:
+                widget.pack_forget()
+            else:
+                widget.destroy()
+    
+    def build_ranking_view(self):
+        """Create the rankings list and preview widgets; they are reused on every visit."""
+        self._ranking_view = ttk.Frame(self.content_frame)
+        
         # Title
-        title_frame = ttk.Frame(self.content_frame)
+        title_frame = ttk.Frame(self._ranking_view)
         title_frame.pack(fill=tk.X, pady=(0, 10))
         
         ttk.Label(title_frame, text="Image Rankings", font=("Arial", 16, "bold")).pack(side=tk.LEFT)
         
         # Stats
-        total_comparisons = len(self.comparison_history)
-        ttk.Label(title_frame, text=f"Total Comparisons: {total_comparisons}", 
-                 font=("Arial", 10)).pack(side=tk.RIGHT)
+        self.ranking_stats_label = ttk.Label(title_frame, font=("Arial", 10))
+        self.ranking_stats_label.pack(side=tk.RIGHT)
         
         # Main content - split into left (rankings) and right (preview) with resizable panes
-        main_content = ttk.PanedWindow(self.content_frame, orient=tk.HORIZONTAL)
+        main_content = ttk.PanedWindow(self._ranking_view, orient=tk.HORIZONTAL)
         main_content.pack(fill=tk.BOTH, expand=True)
         
         # Left side - Rankings list
         left_panel = ttk.Frame(main_content)
         main_content.add(left_panel, weight=1)
         
-        # Create scrollable frame for rankings
+        # Virtualized rankings list: only rows in view exist as widgets, and they
+        # are re-bound to different images as the canvas scrolls
         canvas = tk.Canvas(left_panel)
         scrollbar = ttk.Scrollbar(left_panel, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
+        self.ranking_canvas = canvas
+        self._ranking_rows = []
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        def _on_yview_change(first, last):
+            scrollbar.set(first, last)
+            self.refresh_ranking_rows()
+        canvas.configure(yscrollcommand=_on_yview_change)
+        canvas.bind("<Configure>", lambda e: self.refresh_ranking_rows())
         
         # Pack scrollbar and canvas
         scrollbar.pack(side="right", fill="y")
@@ -262,82 +442,139 @@ class ImageComparator:
                                     font=("Arial", 10), foreground="gray")
         self.preview_info.pack(pady=5)
         
-        # Sort images by rating (descending)
-        sorted_images = sorted(self.image_files, 
-                             key=lambda x: self.ratings.get(os.path.basename(x), self.INITIAL_ELO), 
-                             reverse=True)
-        
-        # Create ranking entries
-        for rank, image_path in enumerate(sorted_images, 1):
-            self.create_ranking_entry(scrollable_frame, rank, image_path)
-        
-        # Bind mousewheel to canvas
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
-        
-    def create_ranking_entry(self, parent: ttk.Frame, rank: int, image_path: str):
-        """Create a single ranking entry with thumbnail and info."""
-        filename = os.path.basename(image_path)
-        rating = self.ratings.get(filename, self.INITIAL_ELO)
+        # Bind mousewheel to the canvas only; rows bind it too, as they cover the canvas
+        self.bind_ranking_mousewheel(canvas)
+    
+    def refresh_ranking_list(self):
+        """Re-sort the rankings and re-bind the visible rows to the new order."""
+        self.ranking_stats_label.configure(text=f"Total Comparisons: {len(self.comparison_history)}")
+        
+        if self._ranked is not None:
+            # Already in order; images sharing a filename share its rating
+            sorted_images = [path for i in self._ranked for path in self._idx_paths[i]]
+            indices = np.fromiter((self._idx[self._basename[path]] for path in sorted_images),
+                                  dtype=np.intp, count=len(sorted_images))
+        else:
+            # Sort images by rating (descending); stable so ties keep directory order
+            order = np.argsort(-self._R[self._image_idx], kind="stable")
+            sorted_images = [self.image_files[i] for i in order]
+            indices = self._image_idx[order]
+        
+        self._ranked_images = sorted_images
+        self._ranked_ratings = self._R[indices]
+        self._ranked_comps = self._C[indices]
+        self._ranked_colors = self.get_rating_colors(self._ranked_ratings)
+        self.ranking_canvas.configure(scrollregion=(0, 0, 0, len(sorted_images) * self.RANKING_ROW_HEIGHT))
+        
+        # Ratings may have changed for an unchanged (rank, path), so force every row to re-bind
+        for row in self._ranking_rows:
+            row["path"] = None
+        self.refresh_ranking_rows()
+        
+        if self.selected_image_path in self._basename:
+            self.update_preview_info(self.selected_image_path)
+        
+    def bind_ranking_mousewheel(self, widget: tk.Misc):
+        """Scroll the rankings list when the mouse wheel is used over widget."""
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(sequence, self.scroll_rankings)
+    
+    def scroll_rankings(self, event):
+        """Scroll the rankings list one unit per wheel event; X11 reports wheel steps as buttons 4 and 5."""
+        up = event.num == 4 or (event.num != 5 and event.delta > 0)
+        self.ranking_canvas.yview_scroll(-1 if up else 1, "units")
+        
+    def refresh_ranking_rows(self):
+        """Bind the pooled row widgets to the images currently scrolled into view."""
+        canvas = self.ranking_canvas
+        if not canvas.winfo_exists():
+            return
+        row_height = self.RANKING_ROW_HEIGHT
+        width = canvas.winfo_width()
+        first = max(0, int(canvas.canvasy(0) // row_height))
+        visible = canvas.winfo_height() // row_height + 2
+        
+        while len(self._ranking_rows) < visible:
+            self._ranking_rows.append(self.create_ranking_row(canvas))
+        
+        for offset, row in enumerate(self._ranking_rows):
+            index = first + offset
+            if offset < visible and index < len(self._ranked_images):
+                canvas.coords(row["window"], 0, index * row_height)
+                canvas.itemconfigure(row["window"], state="normal", width=width)
+                self.bind_ranking_row(row, index + 1, self._ranked_images[index])
+            else:
+                canvas.itemconfigure(row["window"], state="hidden")
         
-        # Main frame for this entry
-        entry_frame = ttk.Frame(parent, relief=tk.RIDGE, borderwidth=1)
-        entry_frame.pack(fill=tk.X, padx=5, pady=2)
+        # Read ahead one page so scrolling down finds the thumbnails already decoded
+        self.prefetch_thumbnails(self._ranked_images[first + visible:first + 2 * visible])
+    
+    def create_ranking_row(self, canvas: tk.Canvas) -> Dict[str, object]:
+        """Create one reusable ranking row with thumbnail and info labels."""
+        row: Dict[str, object] = {"path": None, "rank": None}
         
-        # Make the entire entry clickable for preview
-        entry_frame.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
+        # Main frame for this entry, fixed height so rows can be positioned by index
+        entry_frame = ttk.Frame(canvas, relief=tk.RIDGE, borderwidth=1, height=self.RANKING_ROW_HEIGHT - 4)
+        entry_frame.pack_propagate(False)
+        row["window"] = canvas.create_window(0, 0, window=entry_frame, anchor="nw",
+                                               height=self.RANKING_ROW_HEIGHT - 4)
         
         # Rank number
-        rank_label = ttk.Label(entry_frame, text=f"#{rank}", font=("Arial", 12, "bold"), width=4)
+        rank_label = ttk.Label(entry_frame, font=("Arial", 12, "bold"), width=4)
         rank_label.pack(side=tk.LEFT, padx=(10, 5), pady=10)
-        rank_label.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
         
         # Thumbnail
         thumbnail_frame = ttk.Frame(entry_frame)
         thumbnail_frame.pack(side=tk.LEFT, padx=5, pady=5)
-        thumbnail_frame.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
-        
-        try:
-            thumbnail = self.load_image_for_display(image_path, self.THUMBNAIL_SIZE)
-            if thumbnail:
-                thumbnail_label = ttk.Label(thumbnail_frame, image=thumbnail)
-                thumbnail_label.image = thumbnail  # Keep a reference
-                thumbnail_label.pack()
-                thumbnail_label.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
-            else:
-                no_preview = ttk.Label(thumbnail_frame, text="No\nPreview", width=10)
-                no_preview.pack()
-                no_preview.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
-        except Exception:
-            error_label = ttk.Label(thumbnail_frame, text="Error\nLoading", width=10)
-            error_label.pack()
-            error_label.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
+        thumbnail_label = ttk.Label(thumbnail_frame)
+        thumbnail_label.pack()
         
         # Info frame
         info_frame = ttk.Frame(entry_frame)
         info_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10, pady=10)
-        info_frame.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
         
         # Filename
-        filename_label = ttk.Label(info_frame, text=filename, font=("Arial", 11, "bold"))
+        filename_label = ttk.Label(info_frame, font=("Arial", 11, "bold"))
         filename_label.pack(anchor=tk.W)
-        filename_label.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
         
         # Rating
-        rating_color = self.get_rating_color(rating)
-        rating_label = ttk.Label(info_frame, text=f"ELO Rating: {rating:.0f}", 
-                               font=("Arial", 10), foreground=rating_color)
+        rating_label = ttk.Label(info_frame, font=("Arial", 10))
         rating_label.pack(anchor=tk.W)
-        rating_label.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
         
         # Comparison count
-        comparisons = sum(1 for pair in self.comparison_history 
-                         if filename in pair)
-        comp_label = ttk.Label(info_frame, text=f"Comparisons: {comparisons}", 
-                             font=("Arial", 9), foreground="gray")
+        comp_label = ttk.Label(info_frame, font=("Arial", 9), foreground="gray")
         comp_label.pack(anchor=tk.W)
-        comp_label.bind("<Button-1>", lambda e: self.show_image_preview(image_path))
+        
+        row.update(frame=entry_frame, rank_label=rank_label, thumbnail_label=thumbnail_label,
+                   filename_label=filename_label, rating_label=rating_label, comp_label=comp_label)
+        
+        # Make the entire entry clickable for preview of whichever image it shows
+        for widget in (entry_frame, rank_label, thumbnail_frame, thumbnail_label, info_frame,
+                       filename_label, rating_label, comp_label):
+            widget.bind("<Button-1>", lambda e, r=row: self.show_image_preview(r["path"]) if r["path"] else None)
+            self.bind_ranking_mousewheel(widget)
+        return row
+    
+    def bind_ranking_row(self, row: Dict[str, object], rank: int, image_path: str):
+        """Show a ranked image's thumbnail and info in a pooled row."""
+        if row["path"] == image_path and row["rank"] == rank:
+            return
+        row["path"] = image_path
+        row["rank"] = rank
+        
+        filename = self._basename[image_path]
+        rating = self._ranked_ratings[rank - 1]
+        color = self.RATING_COLORS[self._ranked_colors[rank - 1]]
+        
+        row["rank_label"].configure(text=f"#{rank}")
+        row["filename_label"].configure(text=filename)
+        row["rating_label"].configure(text=f"ELO Rating: {rating:.0f}", foreground=color)
+        row["comp_label"].configure(text=f"Comparisons: {self._ranked_comps[rank - 1]}")
+        
+        # Placeholder until the thumbnail is decoded in the background
+        row["thumbnail_label"].configure(image="", text="Loading...")
+        row["thumbnail_label"].image = None
+        self.request_thumbnail(row["thumbnail_label"], image_path)
     
     def show_image_preview(self, image_path: str):
         """Show large preview of selected image."""
@@ -345,14 +582,12 @@ class ImageComparator:
             return
             
         self.selected_image_path = image_path
-        filename = os.path.basename(image_path)
-        rating = self.ratings.get(filename, self.INITIAL_ELO)
         
         # Load image for preview at original size
         self.preview_photo = self.load_image_for_display(image_path)
         
-        # Clear and update preview canvas
-        self.preview_canvas.delete("all")
+        # Update preview canvas
+        self.set_canvas_image(self.preview_canvas, self.preview_photo)
         if self.preview_photo:
             # Get image dimensions
             img_width = self.preview_photo.width()
@@ -361,9 +596,6 @@ class ImageComparator:
             # Set scroll region to image size
             self.preview_canvas.configure(scrollregion=(0, 0, img_width, img_height))
             
-            # Place image at top-left of scrollable area
-            self.preview_canvas.create_image(0, 0, image=self.preview_photo, anchor=tk.NW)
-            
             # Center the view on the image initially
             canvas_width = self.preview_canvas.winfo_width()
             canvas_height = self.preview_canvas.winfo_height()
@@ -376,19 +608,20 @@ class ImageComparator:
                 self.preview_canvas.xview_moveto(center_x)
                 self.preview_canvas.yview_moveto(center_y)
         
-        # Update info
-        comparisons = sum(1 for pair in self.comparison_history if filename in pair)
+        self.update_preview_info(image_path)
+    
+    def update_preview_info(self, image_path: str):
+        """Show the previewed image's name, rating and comparison count."""
+        filename = self._basename[image_path]
+        rating = self.get_rating(filename)
+        comparisons = self.get_comparison_count(filename)
         info_text = f"{filename}\nELO: {rating:.0f} | Comparisons: {comparisons}"
         self.preview_info.config(text=info_text, foreground="black")
     
-    def get_rating_color(self, rating: float) -> str:
-        """Get color based on rating relative to initial rating."""
-        if rating > self.INITIAL_ELO + 100:
-            return "green"
-        elif rating < self.INITIAL_ELO - 100:
-            return "red"
-        else:
-            return "black"
+    def get_rating_colors(self, ratings: np.ndarray) -> np.ndarray:
+        """Get indices into RATING_COLORS based on ratings relative to initial rating."""
+        return np.where(ratings > self.INITIAL_ELO + 100, 0,
+                        np.where(ratings < self.INITIAL_ELO - 100, 1, 2))
     
     def show_help(self):
         """Show keyboard shortcuts help."""
@@ -427,7 +660,7 @@ Features:
         
     def export_rankings(self):
         """Export rankings to JSON file."""
-        if not self.ratings:
+        if not self._names:
             messagebox.showwarning("No Data", "No ratings to export.")
             return
             
@@ -442,12 +675,12 @@ Features:
                 export_data = {
                     "ratings": self.ratings,
                     "comparison_history": self.comparison_history,
+                    "match_history": self.match_history,
                     "images_dir": self.images_dir,
                     "total_comparisons": len(self.comparison_history)
                 }
                 
-                with open(filename, 'w') as f:
-                    json.dump(export_data, f, indent=2)
+                write_json(filename, export_data)
                     
                 messagebox.showinfo("Export Successful", f"Rankings exported to {filename}")
             except Exception as e:
@@ -462,11 +695,13 @@ Features:
         
         if filename:
             try:
-                with open(filename, 'r') as f:
-                    import_data = json.load(f)
+                import_data = read_json(filename)
                 
-                self.ratings = import_data.get("ratings", {})
-                self.comparison_history = import_data.get("comparison_history", [])
+                self.comparison_history = [tuple(pair) for pair in import_data.get("comparison_history", [])]
+                self.match_history = [tuple(match) for match in import_data.get("match_history", [])]
+                self._pair_counts = Counter(self.comparison_history)
+                imported_ratings = import_data.get("ratings", {})
+                self.ratings = imported_ratings
                 
                 # Optionally load the directory if it exists
                 imported_dir = import_data.get("images_dir")
@@ -476,7 +711,7 @@ Features:
                         self.load_images_from_directory(imported_dir)
                 
                 messagebox.showinfo("Import Successful", 
-                                  f"Imported {len(self.ratings)} ratings and {len(self.comparison_history)} comparisons")
+                                  f"Imported {len(imported_ratings)} ratings and {len(self.comparison_history)} comparisons")
                 
                 # Refresh current view
                 if self.current_view == "ranking":
@@ -490,19 +725,17 @@ Features:
         self.images_dir = directory
         self.dir_label.config(text=os.path.basename(directory))
         
-        # Supported image formats
-        supported_formats = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
-        
         # Find all image files
         self.image_files = []
         try:
-            for file_path in Path(directory).rglob('*'):
-                if file_path.is_file() and file_path.suffix.lower() in supported_formats:
-                    self.image_files.append(str(file_path))
+            self.image_files = list(iter_image_files(directory))
         except Exception as e:
             messagebox.showerror("Error", f"Error loading directory: {e}")
             return
             
+        self._basename = {path: os.path.basename(path) for path in self.image_files}
+        self._next_pair = None
+        
         if not self.image_files:
             messagebox.showwarning("No Images", "No supported image files found in the selected directory.")
             return
@@ -519,34 +752,255 @@ Features:
     
     def initialize_ratings(self):
         """Initialize ELO ratings for all images."""
-        for image_path in self.image_files:
-            filename = os.path.basename(image_path)
-            if filename not in self.ratings:
-                self.ratings[filename] = self.INITIAL_ELO
+        self.add_rated_images(self._basename.values())
+        self._image_idx = np.fromiter((self._idx[name] for name in self._basename.values()),
+                                      dtype=np.intp, count=len(self._basename))
+        self._idx_paths = {}
+        for path, i in zip(self._basename, self._image_idx.tolist()):
+            self._idx_paths.setdefault(i, []).append(path)
+        if SortedList is not None:
+            self._ranked = SortedList(self._idx_paths, key=self.ranking_key)
+    
+    def ranking_key(self, i: int) -> Tuple[float, int]:
+        """Sort key for the rankings: highest rating first, ties in load order."""
+        return (-float(self._R[i]), i)
     
-    def load_image_for_display(self, image_path: str, size: Tuple[int, int] = None) -> Optional[ImageTk.PhotoImage]:
+    def load_image_for_display(self, image_path: str, size: Tuple[int, int] = None) -> Optional[tk.PhotoImage]:
         """Load and optionally resize an image for display."""
         try:
-            # Open image
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary (handles various formats)
-                if img.mode not in ('RGB', 'RGBA'):
-                    img = img.convert('RGB')
-                
-                # Only resize if size is specified (for thumbnails)
-                if size:
-                    img.thumbnail(size, Image.Resampling.LANCZOS)
-                
-                # Create PhotoImage
-                return ImageTk.PhotoImage(img)
+            if size:
+                return self.load_cached_thumbnail(image_path, size)
+            return self.create_photo(self.decode_display_image(image_path))
         except Exception as e:
             print(f"Error loading image {image_path}: {e}")
             return None
     
-    def display_image_on_canvas(self, canvas: tk.Canvas, photo: ImageTk.PhotoImage):
+    def decode_display_image(self, image_path: str) -> Image.Image:
+        """Decode a full-size image as RGB, flattening transparency onto white."""
+        with Image.open(image_path) as img:
+            if img.mode == 'P' and 'transparency' in img.info:
+                img = img.convert('RGBA')
+            if img.mode in ('RGBA', 'LA'):
+                # Tk's photo ingest is much slower with an alpha channel; the
+                # canvases are white, so flattening onto white looks the same
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel('A'))
+                return background
+            if img.mode != 'RGB':
+                return img.convert('RGB')
+            # Leaving the with-block only closes the file; loaded pixel data stays valid
+            img.load()
+            return img
+    
+    def create_photo(self, img: Image.Image) -> tk.PhotoImage:
+        """Create a Tk photo from an RGB image in one block copy via PPM data."""
+        ppm = b'P6\n%d %d\n255\n' % img.size + img.tobytes()
+        try:
+            return tk.PhotoImage(data=base64.b64encode(ppm))
+        except tk.TclError:
+            return ImageTk.PhotoImage(img)
+    
+    def load_cached_thumbnail(self, image_path: str, size: Tuple[int, int]) -> ImageTk.PhotoImage:
+        """Return a thumbnail PhotoImage, using the memory and disk caches when possible."""
+        key = (image_path, os.path.getmtime(image_path), size)
+        photo = self._thumb_cache.get(key)
+        if photo is not None:
+            self._thumb_cache.move_to_end(key)
+            return photo
+        
+        return self.cache_thumbnail(key, self.load_thumbnail_image(image_path, size))
+    
+    def cache_thumbnail(self, key: Tuple[str, float, Tuple[int, int]], image: Image.Image) -> ImageTk.PhotoImage:
+        """Wrap a decoded thumbnail in a PhotoImage and add it to the memory cache."""
+        photo = ImageTk.PhotoImage(image)
+        self._thumb_cache[key] = photo
+        if len(self._thumb_cache) > self.THUMB_CACHE_SIZE:
+            self._thumb_cache.popitem(last=False)
+        return photo
+    
+    def request_thumbnail(self, label: ttk.Label, image_path: str):
+        """Show a thumbnail on the label, decoding it on the thread pool if not cached."""
+        size = self.THUMBNAIL_SIZE
+        # A recycled row label may still have a decode pending for its previous image
+        previous = getattr(label, "thumb_future", None)
+        if previous is not None:
+            previous.cancel()
+        label.thumb_future = None
+        
+        try:
+            key = (image_path, os.path.getmtime(image_path), size)
+        except OSError:
+            label.thumb_key = None
+            label.configure(text="Error\nLoading")
+            return
+        label.thumb_key = key
+        
+        photo = self._thumb_cache.get(key)
+        if photo is not None:
+            self._thumb_cache.move_to_end(key)
+            self.set_thumbnail(label, photo)
+            return
+        
+        # Already being decoded by a read-ahead batch; the drain fills the label when it lands
+        if key in self._thumb_prefetching:
+            self._thumb_waiting.setdefault(key, []).append(label)
+            return
+        
+        # PhotoImages must be created on the Tk thread, so workers only return PIL images
+        future = self._thumb_pool.submit(self.load_thumbnail_image, image_path, size)
+        future.add_done_callback(lambda f: self._thumb_results.put((label, key, f)))
+        self._thumb_futures.append(future)
+        label.thumb_future = future
+        self._thumb_pending += 1
+        self.schedule_thumbnail_drain()
+    
+    def prefetch_thumbnails(self, image_paths: List[str]):
+        """Decode thumbnails that aren't cached yet in one background batch."""
+        size = self.THUMBNAIL_SIZE
+        keys = []
+        for image_path in image_paths:
+            try:
+                key = (image_path, os.path.getmtime(image_path), size)
+            except OSError:
+                continue
+            if key not in self._thumb_cache and key not in self._thumb_prefetching:
+                keys.append(key)
+        if not keys:
+            return
+        
+        self._thumb_prefetching.update(keys)
+        future = self._thumb_pool.submit(self.load_thumbnail_batch, keys)
+        future.add_done_callback(lambda f: self._thumb_results.put((None, keys, f)))
+        self._thumb_futures.append(future)
+        self._thumb_pending += 1
+        self.schedule_thumbnail_drain()
+    
+    def load_thumbnail_batch(self, keys: List[Tuple[str, float, Tuple[int, int]]]
+                             ) -> List[Tuple[Tuple[str, float, Tuple[int, int]], Optional[Image.Image]]]:
+        """Decode a batch of thumbnails in rank order; failed images map to None."""
+        results = []
+        for key in keys:
+            try:
+                results.append((key, self.load_thumbnail_image(key[0], key[2])))
+            except Exception:
+                results.append((key, None))
+        return results
+    
+    def schedule_thumbnail_drain(self):
+        """Poll for finished thumbnails from the Tk event loop."""
+        if not self._thumb_drain_scheduled:
+            self._thumb_drain_scheduled = True
+            self.root.after(30, self.drain_thumbnails)
+    
+    def drain_thumbnails(self):
+        """Apply all thumbnails finished since the last poll."""
+        self._thumb_drain_scheduled = False
+        while True:
+            try:
+                label, key, future = self._thumb_results.get_nowait()
+            except queue.Empty:
+                break
+            self._thumb_pending -= 1
+            if label is None:
+                # Read-ahead batch: fill the memory cache and any rows that became visible
+                self._thumb_prefetching.difference_update(key)
+                images = {} if future.cancelled() else dict(future.result())
+                for thumb_key in key:
+                    image = images.get(thumb_key)
+                    photo = self._thumb_cache.get(thumb_key)
+                    if image is not None and photo is None:
+                        photo = self.cache_thumbnail(thumb_key, image)
+                    for label in self._thumb_waiting.pop(thumb_key, ()):
+                        if not label.winfo_exists() or getattr(label, "thumb_key", None) != thumb_key:
+                            continue
+                        if photo is not None:
+                            self.set_thumbnail(label, photo)
+                        elif future.cancelled():
+                            self.request_thumbnail(label, thumb_key[0])
+                        else:
+                            label.configure(text="Error\nLoading")
+                continue
+            if future.cancelled() or not label.winfo_exists():
+                continue
+            if getattr(label, "thumb_key", key) != key:
+                # The row was re-bound to another image; still cache the result
+                if future.exception() is None:
+                    self.cache_thumbnail(key, future.result())
+                continue
+            try:
+                photo = self.cache_thumbnail(key, future.result())
+            except Exception as e:
+                print(f"Error loading image {key[0]}: {e}")
+                label.configure(text="Error\nLoading")
+                continue
+            self.set_thumbnail(label, photo)
+        
+        if self._thumb_pending > 0:
+            self.schedule_thumbnail_drain()
+        else:
+            self._thumb_futures.clear()
+    
+    def set_thumbnail(self, label: ttk.Label, photo: ImageTk.PhotoImage):
+        """Show a thumbnail on a label."""
+        label.configure(image=photo, text="")
+        label.image = photo  # Keep a reference
+    
+    def cancel_thumbnail_loads(self):
+        """Cancel thumbnail decodes that haven't started yet, e.g. on view switch."""
+        for future in self._thumb_futures:
+            future.cancel()
+        self._thumb_futures = [future for future in self._thumb_futures if not future.done()]
+    
+    def shutdown(self):
+        """Stop background workers."""
+        self.cancel_thumbnail_loads()
+        self._thumb_pool.shutdown(wait=False)
+    
+    def load_thumbnail_image(self, image_path: str, size: Tuple[int, int]) -> Image.Image:
+        """Return a thumbnail as a PIL image, reading or filling the on-disk cache."""
+        digest = hashlib.sha1(os.path.abspath(image_path).encode("utf-8")).hexdigest()
+        cache_file = os.path.join(self.THUMB_CACHE_DIR, f"{digest}_{size[0]}x{size[1]}.png")
+        
+        # Cached thumbnails are valid as long as they are newer than the source
+        try:
+            if os.path.getmtime(cache_file) >= os.path.getmtime(image_path):
+                with Image.open(cache_file) as cached:
+                    cached.load()
+                    return cached.copy()
+        except OSError:
+            pass
+        
+        with Image.open(image_path) as img:
+            # Let libjpeg scale down by 1/2, 1/4 or 1/8 while decoding (no-op for other formats)
+            img.draft('RGB', size)
+            # Convert to RGB if necessary (handles various formats)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGB')
+            # At 100x100 BILINEAR is indistinguishable from LANCZOS and several times faster
+            img.thumbnail(size, Image.Resampling.BILINEAR)
+            thumbnail = img.copy()
+        
+        try:
+            os.makedirs(self.THUMB_CACHE_DIR, exist_ok=True)
+            # Write to a temporary file and rename, so readers never see a partial thumbnail
+            fd, temp_file = tempfile.mkstemp(dir=self.THUMB_CACHE_DIR, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    thumbnail.save(f, "PNG")
+                os.replace(temp_file, cache_file)
+            except BaseException:
+                os.remove(temp_file)
+                raise
+        except Exception as e:
+            # The thumbnail itself decoded fine; a failed cache write only costs a re-decode later
+            print(f"Could not cache thumbnail for {image_path}: {e}")
+        return thumbnail
+    
+    def display_image_on_canvas(self, canvas: tk.Canvas, photo: tk.PhotoImage):
         """Display an image on a canvas, centered."""
-        canvas.delete("all")
-        if photo:
+        if not photo:
+            self.set_canvas_image(canvas, None)
+        else:
             # Center the image on canvas
             canvas_width = canvas.winfo_width()
             canvas_height = canvas.winfo_height()
@@ -559,67 +1013,102 @@ Features:
             x = canvas_width // 2
             y = canvas_height // 2
             
-            canvas.create_image(x, y, image=photo, anchor=tk.CENTER)
+            self.set_canvas_image(canvas, photo, x, y, anchor=tk.CENTER)
+    
+    def set_canvas_image(self, canvas: tk.Canvas, photo: Optional[tk.PhotoImage],
+                         x: int = 0, y: int = 0, anchor: str = tk.NW):
+        """Show photo on the canvas, reusing its image item instead of recreating it."""
+        img_id = getattr(canvas, "_img_id", None)
+        if photo is None:
+            if img_id is not None:
+                canvas.itemconfigure(img_id, image="", state="hidden")
+        elif img_id is None:
+            canvas._img_id = canvas.create_image(x, y, image=photo, anchor=anchor)
+        else:
+            canvas.itemconfigure(img_id, image=photo, anchor=anchor, state="normal")
+            canvas.coords(img_id, x, y)
         
     def get_pair_frequency(self, img1: str, img2: str) -> int:
         """Get how many times this pair has been compared."""
-        pair = tuple(sorted([os.path.basename(img1), os.path.basename(img2)]))
-        return self.comparison_history.count(pair)
+        pair = tuple(sorted([self._basename[img1], self._basename[img2]]))
+        return self._pair_counts.get(pair, 0)
     
-    def select_smart_pair(self) -> Tuple[Optional[str], Optional[str]]:
-        """Select a pair of images, avoiding recently compared pairs when possible."""
+    def select_smart_pair(self, neighbours: int = 10) -> Tuple[Optional[str], Optional[str]]:
+        """Select an informative pair of images.
+        
+        The first image is one of the least compared; its opponent is the
+        closest-rated of the nearest neighbours, skipping opponents it has
+        already met more often than the others.
+        """
         if len(self.image_files) < 2:
             return None, None
-            
-        # Try to find a pair that hasn't been compared yet (or least compared)
-        min_frequency = float('inf')
-        best_pairs = []
         
-        # Sample pairs to avoid checking all combinations for large datasets
-        max_attempts = min(100, len(self.image_files) * 2)
+        indices = self._image_idx
+        counts = self._C[indices]
+        ratings = self._R[indices]
         
-        for _ in range(max_attempts):
-            img1 = random.choice(self.image_files)
-            img2 = random.choice(self.image_files)
-            
-            if img1 == img2:
-                continue
-                
-            frequency = self.get_pair_frequency(img1, img2)
-            
-            if frequency < min_frequency:
-                min_frequency = frequency
-                best_pairs = [(img1, img2)]
-            elif frequency == min_frequency:
-                best_pairs.append((img1, img2))
-        
-        if best_pairs:
-            return random.choice(best_pairs)
-        else:
-            # Fallback to random selection
-            img1 = random.choice(self.image_files)
-            img2 = random.choice(self.image_files)
-            while img2 == img1 and len(self.image_files) > 1:
-                img2 = random.choice(self.image_files)
-            return img1, img2
+        least_compared = np.flatnonzero(counts == counts.min())
+        first = int(random.choice(least_compared))
+        
+        # Rating distance, lightly penalising busy images; jitter breaks ties randomly
+        scores = np.abs(ratings - ratings[first]) + 0.01 * counts + np.random.random(len(indices)) * 1e-6
+        # Files in different folders can share a basename and so a rating entry;
+        # they are the same contestant and must never be paired with each other
+        scores[indices == indices[first]] = np.inf
+        candidates = int(np.isfinite(scores).sum())
+        if candidates == 0:
+            return None, None
+        k = min(neighbours, candidates)
+        nearest = np.argpartition(scores, k - 1)[:k]
+        nearest = nearest[np.argsort(scores[nearest])]
+        
+        img1 = self.image_files[first]
+        frequencies = [self.get_pair_frequency(img1, self.image_files[i]) for i in nearest]
+        img2 = self.image_files[nearest[frequencies.index(min(frequencies))]]
+        
+        return (img1, img2) if random.random() < 0.5 else (img2, img1)
+    
     def load_new_pair(self):
         """Load a new pair of images for comparison."""
         if len(self.image_files) < 2:
             return
             
-        # Use smart pair selection
-        self.current_left_image, self.current_right_image = self.select_smart_pair()
-        
-        if not self.current_left_image or not self.current_right_image:
-            return
-        
-        # Load and display images
-        self.left_photo = self.load_image_for_display(self.current_left_image)  # No size limit for comparison
-        self.right_photo = self.load_image_for_display(self.current_right_image)  # No size limit for comparison
+        # Use the prefetched pair if there is one, otherwise smart pair selection
+        next_pair, self._next_pair = self._next_pair, None
+        if next_pair is not None:
+            self.current_left_image, self.current_right_image, futures = next_pair
+            self.left_photo, self.right_photo = (self.photo_from_future(f, path) for f, path in
+                                                 zip(futures, (self.current_left_image, self.current_right_image)))
+        else:
+            self.current_left_image, self.current_right_image = self.select_smart_pair()
+            
+            if not self.current_left_image or not self.current_right_image:
+                return
+            
+            # Load and display images
+            self.left_photo = self.load_image_for_display(self.current_left_image)  # No size limit for comparison
+            self.right_photo = self.load_image_for_display(self.current_right_image)  # No size limit for comparison
         
         # Update canvases
         self.root.after(1, self.update_canvas_display)  # Delay to ensure canvas is drawn
     
+    def prefetch_next_pair(self):
+        """Choose the next pair now and decode it in the background while feedback is shown."""
+        left, right = self.select_smart_pair()
+        if not left or not right:
+            return
+        futures = (self._thumb_pool.submit(self.decode_display_image, left),
+                   self._thumb_pool.submit(self.decode_display_image, right))
+        self._next_pair = (left, right, futures)
+    
+    def photo_from_future(self, future: Future, image_path: str) -> Optional[tk.PhotoImage]:
+        """Wrap an image decoded in the background in a PhotoImage; waits if still decoding."""
+        try:
+            return self.create_photo(future.result())
+        except Exception as e:
+            print(f"Error loading image {image_path}: {e}")
+            return None
+    
     def update_canvas_display(self):
         """Update the canvas display with current images."""
         if self.left_photo:
@@ -627,11 +1116,20 @@ Features:
         if self.right_photo:
             self.display_image_on_canvas(self.right_canvas, self.right_photo)
         
-    def calculate_elo_update(self, winner_rating: float, loser_rating: float) -> Tuple[float, float]:
-        """Calculate new ELO ratings after a match."""
-        # Expected scores
-        expected_winner = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
-        expected_loser = 1 / (1 + 10 ** ((winner_rating - loser_rating) / 400))
+    def calculate_elo_update(self, winner_rating, loser_rating):
+        """Calculate new ELO ratings after a match.
+        
+        Accepts floats or NumPy arrays of ratings, so many independent
+        matches can be updated in one call.
+        """
+        # Expected scores, looked up by rounded rating difference
+        diff = loser_rating - winner_rating
+        if isinstance(diff, np.ndarray):
+            offset = np.clip(np.rint(diff), -self.ELO_MAX_DIFF, self.ELO_MAX_DIFF).astype(np.intp)
+        else:
+            offset = max(-self.ELO_MAX_DIFF, min(self.ELO_MAX_DIFF, int(round(diff))))
+        expected_winner = self._EXP_TABLE[offset + self.ELO_MAX_DIFF]
+        expected_loser = 1.0 - expected_winner
         
         # New ratings (winner gets 1 point, loser gets 0)
         new_winner_rating = winner_rating + self.K_FACTOR * (1 - expected_winner)
@@ -641,20 +1139,81 @@ Features:
     
     def update_ratings(self, winner_path: str, loser_path: str):
         """Update ELO ratings after a comparison."""
-        winner_filename = os.path.basename(winner_path)
-        loser_filename = os.path.basename(loser_path)
-        
-        winner_rating = self.ratings.get(winner_filename, self.INITIAL_ELO)
-        loser_rating = self.ratings.get(loser_filename, self.INITIAL_ELO)
+        winner_filename = self._basename[winner_path]
+        loser_filename = self._basename[loser_path]
         
-        new_winner_rating, new_loser_rating = self.calculate_elo_update(winner_rating, loser_rating)
+        self.add_rated_images((winner_filename, loser_filename))
+        w, l = self._idx[winner_filename], self._idx[loser_filename]
         
-        self.ratings[winner_filename] = new_winner_rating
-        self.ratings[loser_filename] = new_loser_rating
+        # Re-position both images in the sorted rankings; keys must not change while listed
+        ranked = [i for i in {w, l} if i in self._idx_paths] if self._ranked is not None else []
+        for i in ranked:
+            self._ranked.remove(i)
+        self._R[w], self._R[l] = self.calculate_elo_update(self._R[w], self._R[l])
+        for i in ranked:
+            self._ranked.add(i)
         
         # Record this comparison
         pair = tuple(sorted([winner_filename, loser_filename]))
         self.comparison_history.append(pair)
+        self._pair_counts[pair] += 1
+        self._C[w] += 1
+        self._C[l] += 1
+        self.match_history.append((winner_filename, loser_filename))
+    
+    def replay_history(self, shuffles: int = 0) -> Dict[str, float]:
+        """Recompute ratings from scratch by replaying the match history.
+        
+        With shuffles > 0 the history is replayed in that many random orders
+        and the results averaged, removing the bias from match order. With
+        numba installed the replay runs as a compiled loop; otherwise all
+        orderings are advanced together as one array per step.
+        """
+        names = sorted(set(self._names) | {name for match in self.match_history for name in match})
+        index = {name: i for i, name in enumerate(names)}
+        ratings = np.full((max(1, shuffles), len(names)), float(self.INITIAL_ELO))
+        
+        if self.match_history:
+            winners = np.array([index[w] for w, _ in self.match_history])
+            losers = np.array([index[l] for _, l in self.match_history])
+            if shuffles > 0:
+                orders = np.argsort(np.random.random((shuffles, len(winners))), axis=1)
+            else:
+                orders = np.arange(len(winners))[np.newaxis, :]
+            winners = winners[orders]
+            losers = losers[orders]
+            
+            if _elo_replay is not None:
+                _elo_replay(ratings, winners, losers, float(self.K_FACTOR), self._EXP_TABLE)
+            else:
+                rows = np.arange(ratings.shape[0])
+                for step in range(winners.shape[1]):
+                    w, l = winners[:, step], losers[:, step]
+                    ratings[rows, w], ratings[rows, l] = self.calculate_elo_update(ratings[rows, w], ratings[rows, l])
+        
+        mean_ratings = ratings.mean(axis=0)
+        return {name: float(mean_ratings[i]) for i, name in enumerate(names)}
+    
+    def recalculate_ratings(self):
+        """Replace current ratings with ratings averaged over shuffled replays."""
+        if not self.match_history:
+            messagebox.showwarning("No Data", "No match history to recalculate from.")
+            return
+        # Exports from older versions carry comparisons but no winners; replaying only
+        # the matches recorded since would throw away the imported ratings
+        missing = len(self.comparison_history) - len(self.match_history)
+        if missing > 0 and not messagebox.askyesno(
+                "Incomplete Match History",
+                f"{missing} of {len(self.comparison_history)} comparisons have no recorded winner "
+                f"(e.g. imported from an older export) and cannot be replayed.\n\n"
+                f"Recalculating would replace all current ratings with ratings from only "
+                f"{len(self.match_history)} matches. Continue?"):
+            return
+        self.ratings = self.replay_history(shuffles=25)
+        messagebox.showinfo("Ratings Recalculated",
+                            f"Recalculated ratings from {len(self.match_history)} matches (averaged over 25 orderings)")
+        if self.current_view == "ranking":
+            self.show_ranking_view()
         
     def select_winner(self, winner: str):
         """Handle winner selection."""
@@ -672,10 +1231,11 @@ Features:
         self.update_ratings(winner_path, loser_path)
         
         # Show brief feedback
-        winner_name = os.path.basename(winner_path)
-        self.status_label.config(text=f"Winner: {winner_name} (New rating: {self.ratings[winner_name]:.0f})")
+        winner_name = self._basename[winner_path]
+        self.status_label.config(text=f"Winner: {winner_name} (New rating: {self.get_rating(winner_name):.0f})")
         
-        # Load next pair
+        # Load next pair, decoding it while the result is shown
+        self.prefetch_next_pair()
         self.root.after(1500, self.load_new_pair)  # Brief delay to show result
         
     def skip_pair(self):
@@ -687,8 +1247,12 @@ Features:
 
 def main():
     """Main entry point."""
+    if not is_pillow_simd():
+        print("Tip: install pillow-simd for faster thumbnail resizing "
+              "(pip uninstall pillow && pip install pillow-simd)")
     app = ImageComparator()
     app.root.mainloop()
+    app.shutdown()
 
 
 if __name__ == "__main__":
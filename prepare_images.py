@@ -9,11 +9,53 @@ target sizes and saves them to corresponding output directories.
 import os
 import sys
 import yaml
+import io
+import gc
 import argparse
+import threading
+import multiprocessing
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from PIL import Image, ImageOps
+import numpy as np
+import PIL
+from PIL import Image, ImageOps, features
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple, Union
+
+# Optional: OpenCV's PNG encoder is faster than Pillow's (pip install opencv-python-headless)
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Optional: libvips streams decode, resize and encode without a full-size buffer (pip install pyvips[binary])
+try:
+    import pyvips
+    # libvips reports each finished threadpool at INFO level
+    logging.getLogger('pyvips').setLevel(logging.WARNING)
+except ImportError:
+    pyvips = None
+
+# White square canvases reused across images in this process, by target size
+_canvas_cache: Dict[int, Image.Image] = {}
+_array_canvas_cache: Dict[int, np.ndarray] = {}
+
+# Images processed by this process since the last garbage collection
+GC_INTERVAL = 100
+_files_since_gc = 0
+
+# Settings shared by every task, set once per process by _configure_worker
+_worker_settings: Dict[str, Any] = {}
+
+
+@dataclass
+class SizeSpec:
+    """Per-size values computed once per run: the size, output path prefix and existing output stems."""
+    size: int
+    dest_prefix: str
+    existing: Set[str]
 
 
 def setup_logging(log_level: str = "INFO") -> None:
@@ -24,6 +66,24 @@ def setup_logging(log_level: str = "INFO") -> None:
     )
 
 
+def log_pillow_features() -> None:
+    """Logs which accelerated Pillow build and codecs are in use."""
+    # Pillow-SIMD releases carry a '.postN' suffix on the Pillow version they track
+    simd = 'post' in PIL.__version__
+    turbo = features.check_feature('libjpeg_turbo')
+    zlib_ng = 'zlib_ng' in features.features and features.check_feature('zlib_ng')
+    logging.info(f"Pillow {PIL.__version__} (SIMD: {'yes' if simd else 'no'}, "
+                 f"libjpeg-turbo: {'yes' if turbo else 'no'}, zlib-ng: {'yes' if zlib_ng else 'no'})")
+    if not simd:
+        logging.info("Tip: install pillow-simd for faster resizing "
+                     "(pip uninstall pillow && pip install pillow-simd)")
+    
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        info = io.StringIO()
+        features.pilinfo(out=info, supported_formats=False)
+        logging.debug(info.getvalue())
+
+
 def load_config(config_path: str) -> Dict[str, Any]:
     """Loads configuration from a YAML file."""
     try:
@@ -52,6 +112,37 @@ def get_resampling_method(method_name: str):
     return methods.get(method_name.upper(), Image.LANCZOS)
 
 
+def get_adaptive_resampling(resampling_method, scale_factor: float):
+    """
+    Returns a cheaper resampling method where it gives the same result.
+    For moderate downscales (down to half size) BICUBIC is indistinguishable
+    from LANCZOS; larger downscales and upscales keep the configured method.
+    """
+    if resampling_method == Image.LANCZOS and 0.5 <= scale_factor <= 1.0:
+        return Image.BICUBIC
+    return resampling_method
+
+
+def get_cv2_interpolation(method_name: str, downscale: bool) -> int:
+    """
+    Returns the OpenCV interpolation closest to a PIL resampling method.
+    OpenCV only antialiases with INTER_AREA, so every method except NEAREST
+    uses it when downscaling.
+    """
+    if method_name.upper() == "NEAREST":
+        return cv2.INTER_NEAREST
+    if downscale:
+        return cv2.INTER_AREA
+    methods = {
+        "BILINEAR": cv2.INTER_LINEAR,
+        "BICUBIC": cv2.INTER_CUBIC,
+        "LANCZOS": cv2.INTER_LANCZOS4,
+        "HAMMING": cv2.INTER_CUBIC,
+        "BOX": cv2.INTER_AREA
+    }
+    return methods.get(method_name.upper(), cv2.INTER_LANCZOS4)
+
+
 def get_image_files(directory: str, supported_formats: List[str]) -> List[Path]:
     """Finds all supported image files in the directory."""
     directory_path = Path(directory)
@@ -59,21 +150,14 @@ def get_image_files(directory: str, supported_formats: List[str]) -> List[Path]:
         logging.error(f"Input directory does not exist: {directory}")
         return []
     
-    image_files = []
-    for ext in supported_formats:
-        # Search for lowercase extension
-        pattern = f"*{ext.lower()}"
-        image_files.extend(directory_path.glob(pattern))
-        # Also consider uppercase variants only if different from lowercase
-        upper_pattern = f"*{ext.upper()}"
-        if upper_pattern != pattern:
-            image_files.extend(directory_path.glob(upper_pattern))
-    
-    # Remove duplicates by converting to set and back to list
-    unique_files = list(set(image_files))
+    # One directory scan with a case-insensitive extension check
+    suffixes = {ext.lower() if ext.startswith('.') else f".{ext.lower()}" for ext in supported_formats}
+    with os.scandir(directory_path) as entries:
+        image_files = [Path(entry.path) for entry in entries
+                       if os.path.splitext(entry.name)[1].lower() in suffixes and entry.is_file()]
     
-    logging.info(f"Found image files: {len(unique_files)}")
-    return sorted(unique_files)
+    logging.info(f"Found image files: {len(image_files)}")
+    return sorted(image_files)
 
 
 def create_output_directories(base_dir: str, sizes: List[int]) -> Dict[int, Path]:
@@ -90,60 +174,199 @@ def create_output_directories(base_dir: str, sizes: List[int]) -> Dict[int, Path
     return output_dirs
 
 
-def resize_image(image_path: Path, target_size: int, resampling_method) -> Image.Image:
+def read_file(path: Path) -> Optional[bytes]:
+    """Reads a file's bytes, or returns None so the error is reported where it is opened."""
+    try:
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def iter_with_file_data(tasks: Iterable[tuple], reader: ThreadPoolExecutor, window: int,
+                        slots: threading.Semaphore, stop: threading.Event) -> Iterator[tuple]:
     """
-    Scales an image to the target size (square) while maintaining aspect ratio.
-    Adds padding if necessary to achieve square format.
+    Yields each task with its source file's bytes appended, reading up to
+    window files ahead on the reader threads. Takes one of slots before each
+    task, so the consumer bounds how many tasks are in flight, and stops
+    early once stop is set.
+    """
+    tasks = iter(tasks)
+    pending = deque()
+    for task in tasks:
+        pending.append((task, reader.submit(read_file, task[0])))
+        if len(pending) >= window:
+            break
+    
+    while pending:
+        slots.acquire()
+        if stop.is_set():
+            return
+        task, future = pending.popleft()
+        next_task = next(tasks, None)
+        if next_task is not None:
+            pending.append((next_task, reader.submit(read_file, next_task[0])))
+        yield task + (future.result(),)
+
+
+def load_rgb_image(image_path: Path, max_target_size: Optional[int] = None,
+                   data: Optional[bytes] = None) -> Image.Image:
+    """
+    Opens and decodes an image once, converted to RGB.
+    Transparent areas are flattened onto a white background.
+    With max_target_size, JPEGs are decoded at a reduced scale that still
+    leaves at least twice that size for the final resize.
+    If data is given, the image is decoded from it instead of read from image_path.
     """
     try:
-        with Image.open(image_path) as img:
+        with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
+            if max_target_size:
+                # No-op for formats other than JPEG
+                img.draft('RGB', (max_target_size * 2, max_target_size * 2))
+            
+            # Palette images only have alpha if they define a transparent color
+            if img.mode == 'P':
+                img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+            
             # Convert to RGB if necessary (for JPEG output)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background for transparent images
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = background
+            if img.mode in ('RGBA', 'LA'):
+                # Fully opaque images need no blending, only the alpha band is checked
+                if img.getchannel('A').getextrema()[0] == 255:
+                    img = img.convert('RGB')
+                else:
+                    # Blend transparent images onto a white background
+                    rgba = np.asarray(img if img.mode == 'RGBA' else img.convert('RGBA'))
+                    img = Image.fromarray(flatten_alpha(rgba))
+                    del rgba
             elif img.mode != 'RGB':
                 img = img.convert('RGB')
+            else:
+                img.load()
+            return img
             
-            # Calculate scaling factor to fit the image within target_size
-            original_width, original_height = img.size
-            scale_factor = min(target_size / original_width, target_size / original_height)
-            
-            # Calculate new dimensions
-            new_width = int(original_width * scale_factor)
-            new_height = int(original_height * scale_factor)
-            
-            # Resize the image (both up and down scaling)
-            img = img.resize((new_width, new_height), resampling_method)
-            
-            # Create square image with white background
-            square_img = Image.new('RGB', (target_size, target_size), (255, 255, 255))
-            
-            # Center the image
-            offset_x = (target_size - img.width) // 2
-            offset_y = (target_size - img.height) // 2
-            square_img.paste(img, (offset_x, offset_y))
-            
-            return square_img
-            
+    except Image.UnidentifiedImageError:
+        # Pillow's message names the object it was given, which is a BytesIO for prefetched data
+        logging.error(f"Error opening/processing {image_path}: cannot identify image file")
+        return None
     except Exception as e:
         logging.error(f"Error opening/processing {image_path}: {e}")
         return None
 
 
-def save_image(image: Image.Image, output_path: Path, quality_settings: Dict[str, Any]) -> bool:
-    """Saves the image with the specified quality settings."""
+def flatten_alpha(rgba: np.ndarray) -> np.ndarray:
+    """Composites an RGBA array onto white in one integer pass, rounding like an exact blend."""
+    # rgb * alpha + 255 * (255 - alpha) never exceeds 255 * 255, so uint16 is enough
+    rgb = rgba[..., :3].astype(np.uint16)
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    return ((rgb * alpha + 255 * (255 - alpha) + 127) // 255).astype(np.uint8)
+
+
+def get_fit_size(original_size: Tuple[int, int], target_size: int) -> Tuple[int, int]:
+    """Returns the largest size with the original aspect ratio that fits within the target size."""
+    # Calculate scaling factor to fit the image within target_size
+    original_width, original_height = original_size
+    scale_factor = min(target_size / original_width, target_size / original_height)
+    
+    # Calculate new dimensions
+    return int(original_width * scale_factor), int(original_height * scale_factor)
+
+
+def fit_image(img: Image.Image, original_size: Tuple[int, int], target_size: int, resampling_method,
+              adaptive: bool = False) -> Image.Image:
+    """
+    Scales an image to fit within the target size while maintaining aspect ratio.
+    The output size is computed from original_size, so img may be a larger,
+    already scaled version of the original (cascaded downscaling).
+    With adaptive, the method is chosen by the scale of this step.
+    """
+    new_size = get_fit_size(original_size, target_size)
+    if adaptive:
+        resampling_method = get_adaptive_resampling(resampling_method, new_size[0] / img.width)
+    # Resize the image (both up and down scaling)
+    return img.resize(new_size, resampling_method)
+
+
+def fit_array(arr: np.ndarray, original_size: Tuple[int, int], target_size: int, method_name: str) -> np.ndarray:
+    """Same as fit_image for an RGB array, resized with OpenCV."""
+    new_width, new_height = get_fit_size(original_size, target_size)
+    downscale = new_width < arr.shape[1]
+    return cv2.resize(arr, (new_width, new_height),
+                      interpolation=get_cv2_interpolation(method_name, downscale))
+
+
+def pad_to_square(img: Image.Image, target_size: int) -> Image.Image:
+    """
+    Centers an image on a white square of the target size.
+    The square is reused by the next call for the same size, so save it first.
+    """
+    # Reuse the square image for this size, refilled with white background
+    square_img = _canvas_cache.get(target_size)
+    if square_img is None:
+        square_img = _canvas_cache[target_size] = Image.new('RGB', (target_size, target_size), (255, 255, 255))
+    else:
+        square_img.paste((255, 255, 255), (0, 0, target_size, target_size))
+    
+    # Center the image
+    offset_x = (target_size - img.width) // 2
+    offset_y = (target_size - img.height) // 2
+    square_img.paste(img, (offset_x, offset_y))
+    
+    return square_img
+
+
+def pad_array(arr: np.ndarray, target_size: int) -> np.ndarray:
+    """Same as pad_to_square for an RGB array; the array is likewise reused."""
+    height, width = arr.shape[:2]
+    top = (target_size - height) // 2
+    left = (target_size - width) // 2
+    square = _array_canvas_cache.get(target_size)
+    if square is None:
+        square = _array_canvas_cache[target_size] = np.empty((target_size, target_size, 3), dtype=np.uint8)
+    square.fill(255)
+    square[top:top + height, left:left + width] = arr
+    return square
+
+
+def write_file(path: Union[str, Path], data) -> None:
+    """Writes the encoded file in a single call."""
+    with open(path, 'wb') as f:
+        f.write(data)
+        # The outputs are not read back by this script, so keep them out of the page cache
+        if hasattr(os, 'posix_fadvise'):
+            f.flush()
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def save_image(image: Union[Image.Image, np.ndarray], output_path: Union[str, Path], quality_settings: Dict[str, Any]) -> bool:
+    """Saves the image (PIL image or RGB array) with the specified quality settings."""
     try:
-        # Always save as PNG with optimal quality
+        compress_level = quality_settings.get('png_compress_level', 1)
+        if cv2 is not None and not quality_settings.get('optimize', False):
+            # OpenCV expects BGR; imencode + write also handles non-ASCII paths on Windows
+            rgb = image if isinstance(image, np.ndarray) else np.asarray(image)
+            bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+            params = [cv2.IMWRITE_PNG_COMPRESSION, compress_level]
+            # Unfiltered rows skip libpng's per-row filter search (OpenCV 4.10+)
+            if quality_settings.get('png_filter', 'none') == 'none' and hasattr(cv2, 'IMWRITE_PNG_FILTER'):
+                params += [cv2.IMWRITE_PNG_FILTER, cv2.IMWRITE_PNG_FILTER_NONE]
+            ok, encoded = cv2.imencode('.png', bgr, params)
+            if not ok:
+                raise ValueError("OpenCV could not encode the image")
+            write_file(output_path, encoded)
+            return True
+        
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        
+        # Always save as PNG (lossless); a low compression level is much faster to write.
+        # Encoding into memory first turns the encoder's many chunk writes into one
+        buffer = io.BytesIO()
         image.save(
-            output_path,
+            buffer,
             'PNG',
-            compress_level=quality_settings.get('png_compress_level', 6),
-            optimize=True
+            compress_level=compress_level,
+            optimize=quality_settings.get('optimize', False)
         )
+        write_file(output_path, buffer.getbuffer())
         
         return True
     except Exception as e:
@@ -151,7 +374,151 @@ def save_image(image: Image.Image, output_path: Path, quality_settings: Dict[str
         return False
 
 
-def process_images(config: Dict[str, Any], input_dir: str) -> None:
+def _process_one_vips(image_path: Path, pending_sizes: List[Tuple[int, str]], data: Optional[bytes],
+                      quality_settings: Dict[str, Any]) -> Tuple[List[int], int]:
+    """
+    Resizes and saves one image for each size with libvips.
+    Each size is a separate sequential pipeline from the source file, so the
+    full-size image is never held in memory; JPEGs are shrunk while decoding.
+    Returns the sizes that were written and the number of errors.
+    """
+    saved_sizes = []
+    error_count = 0
+    compress_level = quality_settings.get('png_compress_level', 1)
+    png_filter = 'none' if quality_settings.get('png_filter', 'none') == 'none' else 'all'
+    
+    for target_size, output_path in pending_sizes:
+        try:
+            # Fit within the square, enlarging small images like the other backends. EXIF
+            # orientation is ignored as on the Pillow and OpenCV paths, so geometry matches
+            if data is not None:
+                img = pyvips.Image.thumbnail_buffer(data, target_size, height=target_size, size='both',
+                                                   no_rotate=True)
+            else:
+                img = pyvips.Image.thumbnail(str(image_path), target_size, height=target_size, size='both',
+                                            no_rotate=True)
+            # 8-bit RGB, with transparent areas flattened onto white
+            img = img.colourspace('srgb')
+            if img.hasalpha():
+                img = img.flatten(background=[255, 255, 255])
+            if img.format != 'uchar':
+                img = img.cast('uchar')
+            img = img.embed((target_size - img.width) // 2, (target_size - img.height) // 2,
+                            target_size, target_size, extend='background', background=[255, 255, 255])
+            encoded = img.write_to_buffer('.png', compression=compress_level, filter=png_filter)
+        except Exception as e:
+            logging.error(f"Error opening/processing {image_path}: {e}")
+            error_count += 1
+            continue
+        
+        try:
+            write_file(output_path, encoded)
+        except Exception as e:
+            logging.error(f"Error saving {output_path}: {e}")
+            error_count += 1
+            continue
+        logging.debug(f"Saved: {output_path}")
+        saved_sizes.append(target_size)
+    
+    return saved_sizes, error_count
+
+
+def _configure_worker(settings: Dict[str, Any]) -> None:
+    """Stores the settings shared by all tasks and resolves the resampling method once."""
+    _worker_settings.clear()
+    _worker_settings.update(settings)
+    _worker_settings['resampling_method'] = get_resampling_method(settings['resampling_name'])
+    if settings['resize_backend'] == 'vips':
+        # Every image is different, so libvips' operation cache would only hold memory
+        pyvips.cache_set_max(0)
+
+
+def _init_worker(log_level: str, settings: Dict[str, Any]) -> None:
+    """Initializes a worker process."""
+    setup_logging(log_level)
+    _configure_worker(settings)
+    # Each worker already owns a CPU; OpenCV's own threads would only oversubscribe them
+    if cv2 is not None:
+        cv2.setNumThreads(1)
+    if pyvips is not None:
+        pyvips.concurrency_set(1)
+
+
+def _process_one(args: Tuple[Path, List[int], Optional[bytes]]) -> Tuple[Path, List[int], int]:
+    """
+    Resizes and saves one image for each of the given target sizes.
+    The last argument holds the source file's bytes, already read by the main process.
+    Returns the image path, the sizes that were written, and the number of errors.
+    """
+    image_path, target_sizes, data = args
+    dest_prefixes = _worker_settings['dest_prefixes']
+    resampling_name = _worker_settings['resampling_name']
+    resampling_method = _worker_settings['resampling_method']
+    quality_settings = _worker_settings['quality_settings']
+    resize_backend = _worker_settings['resize_backend']
+    adaptive = _worker_settings['adaptive_resampling']
+    saved_sizes = []
+    error_count = 0
+    
+    # Sizes arrive largest first; paths are plain strings built from the per-size prefixes
+    stem_png = image_path.stem + '.png'  # Always save as PNG
+    pending_sizes = [(target_size, dest_prefixes[target_size] + stem_png) for target_size in target_sizes]
+    
+    if resize_backend == "vips":
+        saved_sizes, error_count = _process_one_vips(image_path, pending_sizes, data, quality_settings)
+        return image_path, saved_sizes, error_count
+    
+    # Decode once, then scale each size from the previous (next larger) result
+    base_image = load_rgb_image(image_path, pending_sizes[0][0], data)
+    if base_image is None:
+        return image_path, saved_sizes, len(pending_sizes)
+    original_size = base_image.size
+    use_opencv = resize_backend == "opencv"
+    # The OpenCV backend converts to an array once and stays in NumPy through the save
+    source = np.asarray(base_image) if use_opencv else base_image
+    
+    for target_size, output_path in pending_sizes:
+        # Resize the image
+        try:
+            if use_opencv:
+                source = fit_array(source, original_size, target_size, resampling_name)
+                resized_image = pad_array(source, target_size)
+            else:
+                previous = source
+                source = fit_image(source, original_size, target_size, resampling_method, adaptive)
+                # Free the larger intermediate right away; the base image is closed below
+                if previous is not base_image:
+                    previous.close()
+                resized_image = pad_to_square(source, target_size)
+        except Exception as e:
+            logging.error(f"Error opening/processing {image_path}: {e}")
+            error_count += 1
+            continue
+        
+        # Save the image
+        if save_image(resized_image, output_path, quality_settings):
+            logging.debug(f"Saved: {output_path}")
+            saved_sizes.append(target_size)
+        else:
+            error_count += 1
+    
+    # The padded squares are reused canvases, so only the decoded and scaled images are closed
+    if not use_opencv and source is not base_image:
+        source.close()
+    base_image.close()
+    del base_image, source
+    
+    # Collect periodically so freed image memory is returned while a worker runs many files
+    global _files_since_gc
+    _files_since_gc += 1
+    if _files_since_gc >= GC_INTERVAL:
+        _files_since_gc = 0
+        gc.collect()
+    
+    return image_path, saved_sizes, error_count
+
+
+def process_images(config: Dict[str, Any], input_dir: str, jobs: Optional[int] = None) -> None:
     """Main function for processing all images."""
     # Input directory is now required from CLI
     input_directory = input_dir
@@ -168,8 +535,18 @@ def process_images(config: Dict[str, Any], input_dir: str) -> None:
     target_sizes = config['target_sizes']
     supported_formats = config['supported_formats']
     quality_settings = config['quality']
-    resampling_method = get_resampling_method(config['resampling_method'])
     overwrite_existing = config.get('overwrite_existing', False)
+    resize_backend = config.get('resize_backend', 'pillow').lower()
+    if resize_backend == 'opencv' and cv2 is None:
+        logging.warning("resize_backend 'opencv' needs opencv-python-headless; using Pillow")
+        resize_backend = 'pillow'
+    if resize_backend == 'vips' and pyvips is None:
+        logging.warning("resize_backend 'vips' needs pyvips; using Pillow")
+        resize_backend = 'pillow'
+    resampling_policy = config.get('resampling_policy', 'fixed').lower()
+    if resampling_policy not in ('fixed', 'adaptive'):
+        logging.warning(f"Unknown resampling_policy '{resampling_policy}'; using 'fixed'")
+        resampling_policy = 'fixed'
     
     logging.info(f"Input directory: {input_directory}")
     logging.info(f"Output base directory: {output_base}")
@@ -188,38 +565,89 @@ def process_images(config: Dict[str, Any], input_dir: str) -> None:
     processed_count = 0
     error_count = 0
     
-    logging.info(f"Starting processing of {total_files} images...")
+    # Sizes largest first, the order the workers resize them in. Each output
+    # directory is listed once instead of checking every output file
+    specs = [SizeSpec(size, str(output_dirs[size]) + os.sep, {p.stem for p in output_dirs[size].glob("*.png")})
+             for size in sorted(target_sizes, reverse=True)]
+    specs_by_size = {spec.size: spec for spec in specs}
     
-    for i, image_path in enumerate(image_files, 1):
-        logging.info(f"Processing ({i}/{total_files}): {image_path.name}")
-        
-        # Process for each target size
-        image_processed = False
-        
-        for target_size in target_sizes:
-            output_dir = output_dirs[target_size]
-            output_path = output_dir / f"{image_path.stem}.png"  # Always save as PNG
-            
-            # Check if file already exists
-            if output_path.exists() and not overwrite_existing:
-                logging.info(f"Skipping {output_path} (already exists)")
-                continue
-            
-            # Resize the image
-            resized_image = resize_image(image_path, target_size, resampling_method)
-            if resized_image is None:
-                error_count += 1
-                continue
-            
-            # Save the image
-            if save_image(resized_image, output_path, quality_settings):
-                logging.debug(f"Saved: {output_path}")
-                image_processed = True
+    # Only sizes whose output is missing (or overwritten) are sent to the workers,
+    # so fully processed images are never opened.
+    # Tasks only carry the path and sizes; the shared settings go to each worker once
+    tasks = []
+    # Inputs sharing a stem (a.jpg, a.png) map to the same outputs, so only the first is used
+    seen_stems = {}
+    for image_path in image_files:
+        stem = image_path.stem
+        if stem in seen_stems:
+            logging.warning(f"Skipping {image_path.name}: same output name as {seen_stems[stem].name}")
+            continue
+        seen_stems[stem] = image_path
+        pending_sizes = []
+        for spec in specs:
+            if stem in spec.existing and not overwrite_existing:
+                logging.info(f"Skipping {spec.dest_prefix}{stem}.png (already exists)")
             else:
-                error_count += 1
-        
-        if image_processed:
-            processed_count += 1
+                pending_sizes.append(spec.size)
+        if pending_sizes:
+            tasks.append((image_path, pending_sizes))
+    
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(tasks)))
+    
+    logging.info(f"Starting processing of {len(tasks)}/{total_files} images with {jobs} worker(s)...")
+    
+    # Source files are read on threads in this process, overlapping disk I/O with the
+    # decode/resize/encode work in the workers; only the compressed bytes cross processes
+    chunksize = 4
+    in_flight = 2 * jobs * chunksize
+    reader = ThreadPoolExecutor(max_workers=4)
+    slots = threading.Semaphore(in_flight)
+    stop = threading.Event()
+    tasks_with_data = iter_with_file_data(tasks, reader, in_flight, slots, stop)
+    
+    # Resampling is passed by name so the settings pickle cleanly
+    settings = {
+        'dest_prefixes': {spec.size: spec.dest_prefix for spec in specs},
+        'resampling_name': config['resampling_method'],
+        'quality_settings': quality_settings,
+        'resize_backend': resize_backend,
+        'adaptive_resampling': resampling_policy == 'adaptive',
+    }
+    
+    if not tasks:
+        results = iter(())
+        pool = None
+    elif jobs == 1:
+        _configure_worker(settings)
+        results = map(_process_one, tasks_with_data)
+        pool = None
+    else:
+        # Worker processes don't inherit logging setup when started with spawn (Windows, macOS)
+        log_level = logging.getLevelName(logging.getLogger().getEffectiveLevel())
+        pool = multiprocessing.Pool(processes=jobs, initializer=_init_worker, initargs=(log_level, settings))
+        results = pool.imap_unordered(_process_one, tasks_with_data, chunksize=chunksize)
+    
+    try:
+        for i, (image_path, saved_sizes, errors) in enumerate(results, 1):
+            slots.release()
+            error_count += errors
+            if saved_sizes:
+                logging.info(f"Processed ({i}/{len(tasks)}): {image_path.name}")
+                processed_count += 1
+            else:
+                logging.error(f"Failed ({i}/{len(tasks)}): {image_path.name}")
+            for size in saved_sizes:
+                specs_by_size[size].existing.add(image_path.stem)
+    finally:
+        # Unblock the task feeder if it is waiting for a slot
+        stop.set()
+        slots.release()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        reader.shutdown(wait=False)
     
     # Summary
     logging.info(f"\nProcessing completed!")
@@ -229,8 +657,7 @@ def process_images(config: Dict[str, Any], input_dir: str) -> None:
     
     # Show output directories
     for size, dir_path in output_dirs.items():
-        file_count = len(list(dir_path.glob("*.png")))
-        logging.info(f"Directory {size}x{size}: {file_count} files")
+        logging.info(f"Directory {size}x{size}: {len(specs_by_size[size].existing)} files")
 
 
 def main():
@@ -244,6 +671,7 @@ Examples:
   python prepare_images.py datasets/mymodel/_raw
   python prepare_images.py /path/to/images/_raw --config custom_config.yaml
   python prepare_images.py datasets/aigarasch/_raw --log-level DEBUG
+  python prepare_images.py datasets/aigarasch/_raw --jobs 4
   
 The script automatically derives the output directory from the input directory.
 For input 'datasets/mymodel/_raw', output will be 'datasets/mymodel/'.
@@ -268,10 +696,18 @@ For input 'datasets/mymodel/_raw', output will be 'datasets/mymodel/'.
         help='Log level (default: INFO)'
     )
     
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='Number of worker processes (default: number of CPUs)'
+    )
+    
     args = parser.parse_args()
     
     # Setup logging
     setup_logging(args.log_level)
+    log_pillow_features()
     
     # Check if input directory exists
     if not os.path.exists(args.input_directory):
@@ -288,7 +724,7 @@ For input 'datasets/mymodel/_raw', output will be 'datasets/mymodel/'.
     
     # Start processing
     try:
-        process_images(config, args.input_directory)
+        process_images(config, args.input_directory, args.jobs)
         logging.info("Image processing completed successfully!")
     except KeyboardInterrupt:
         logging.info("\nProcessing interrupted by user.")